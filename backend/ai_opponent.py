@@ -1,21 +1,360 @@
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Hashable, List, Tuple, Optional
+import math
 import random
-import copy
+import threading
+import time
+from batch_evaluation import batch_available, evaluate_moves
+from geometry import geometry
 from go_game import GoGame, Player
+from opening_book import book_moves
+from patterns import SHAPE_BONUS, SHAPE_TABLE, ladder_after, ladder_captured
+from playout import BLACK, PASS, WHITE, PlayoutBoard
+from scoring import DEFAULT_KOMI, area_score
+from transposition import (
+    EXACT,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    TranspositionTable,
+    TTEntry,
+)
+
+if TYPE_CHECKING:
+    from parallel_search import ParallelSearch
+
+# Shared by every GoAI instance so results survive across API requests
+transposition_table = TranspositionTable()
+
+# should_pass looks closer at the open points once this few are left
+ENDGAME_OPEN_POINTS = 8
+
+# Moves of a game during which GoAI plays corner and edge points without
+# searching
+OPENING_MOVES = 10
+
+# Opponent replies searched ahead by GoAI.ponder, most likely first
+PONDER_REPLIES = 3
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search at the deadline or when it is cancelled"""
+
+
+class _MCTSNode:
+    """A tree position reached by `player` playing `move` (a playout point)"""
+
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move: int, player: int, parent: Optional["_MCTSNode"]):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children: List["_MCTSNode"] = []
+        self.untried: Optional[List[int]] = None  # Filled on first expansion
+        self.visits = 0
+        self.wins = 0
+
+
+# Last search tree per (game ID, board size, AI color), kept for reuse on
+# the next request together with the move history it was searched from.
+# A tree can take megabytes, so only the MCTS_TREE_CACHE_SIZE most recently
+# stored are kept.
+MCTS_TREE_CACHE_SIZE = 32
+TreeKey = Tuple[Optional[str], int, int]
+mcts_tree_cache: "OrderedDict[TreeKey, Tuple[list, _MCTSNode]]" = OrderedDict()
+_tree_cache_lock = threading.Lock()
+
+
+def _take_tree(key: TreeKey) -> Optional[Tuple[list, _MCTSNode]]:
+    with _tree_cache_lock:
+        return mcts_tree_cache.pop(key, None)
+
+
+def _keep_tree(key: TreeKey, entry: Tuple[list, _MCTSNode], replace: bool = True):
+    """Cache a tree as the most recent one, dropping the least recent past
+    the cap; with replace=False a tree already cached for `key` wins"""
+    with _tree_cache_lock:
+        if not replace and key in mcts_tree_cache:
+            return
+        mcts_tree_cache[key] = entry
+        mcts_tree_cache.move_to_end(key)
+        while len(mcts_tree_cache) > MCTS_TREE_CACHE_SIZE:
+            mcts_tree_cache.popitem(last=False)
+
+
+# Statistics of the most recent MCTS search, for the metrics endpoint.
+# Each search publishes a new dict rather than changing this one, so
+# readers on other threads never see it half updated.
+_mcts_stats: Dict[str, float] = {}
+
+
+def mcts_stats() -> Dict[str, float]:
+    """A copy of the statistics of the most recent MCTS search"""
+    return dict(_mcts_stats)
+
+
+def forget_game(game_id: str):
+    """Drop the cached search trees of a game that was replaced, removed or
+    compacted"""
+    with _tree_cache_lock:
+        for key in [key for key in mcts_tree_cache if key[0] == game_id]:
+            del mcts_tree_cache[key]
+
+
+class MCTSEngine:
+    """UCT Monte Carlo tree search over random PlayoutBoard playouts"""
+
+    def __init__(
+        self,
+        player: Player,
+        max_playouts: int = 20000,
+        time_limit: float = 5.0,
+        exploration: float = 1.0,
+        komi: float = DEFAULT_KOMI,
+        seed: Optional[int] = None,
+        cancel: Optional[threading.Event] = None,
+        game_id: Optional[str] = None,
+    ):
+        self.player = player
+        self.max_playouts = max_playouts
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.komi = komi
+        self.rng = random.Random(seed)
+        self.cancel = cancel
+        # Trees are cached per game, so concurrent games do not share one
+        self.game_id = game_id
+        self.stats: Dict[str, float] = {}
+
+    def search(
+        self,
+        game: GoGame,
+        valid_moves: List[Tuple[int, int]],
+        deadline: Optional[float] = None,
+    ) -> Optional[Tuple[int, int]]:
+        """Run playouts until the budget is spent and return the most visited move"""
+        visits = self.root_visits(game, valid_moves, deadline)
+        if not visits:
+            return self.rng.choice(valid_moves) if valid_moves else None
+        return max(visits, key=visits.get)
+
+    def root_visits(
+        self,
+        game: GoGame,
+        valid_moves: List[Tuple[int, int]],
+        deadline: Optional[float] = None,
+        reuse_tree: bool = True,
+    ) -> Dict[Tuple[int, int], int]:
+        """Run playouts until the budget is spent; visits per legal root move"""
+        start = time.monotonic()
+        stop = start + self.time_limit
+        if deadline is not None:
+            stop = min(stop, deadline)
+
+        root_board = PlayoutBoard.from_game(game)
+        root = self._reuse_tree(game) if reuse_tree else None
+        reused_visits = root.visits if root is not None else 0
+        if root is None:
+            opponent = Player.BLACK if self.player == Player.WHITE else Player.WHITE
+            root = _MCTSNode(PASS, opponent.value, None)
+            root.untried = [
+                root_board.point(row, col)
+                for row, col in valid_moves
+                if not root_board.is_eye(root_board.point(row, col), self.player.value)
+            ] or [root_board.point(row, col) for row, col in valid_moves]
+
+        playouts = 0
+        while playouts < self.max_playouts:
+            # Checking the clock every few playouts keeps its cost negligible
+            if playouts % 16 == 0 and (
+                time.monotonic() >= stop
+                or (self.cancel is not None and self.cancel.is_set())
+            ):
+                break
+            self._run_playout(root, root_board.copy())
+            playouts += 1
+
+        elapsed = max(time.monotonic() - start, 1e-9)
+        self.stats = {
+            "playouts": playouts,
+            "seconds": elapsed,
+            "playouts_per_sec": playouts / elapsed,
+            "reused_visits": reused_visits,
+            "tree_visits": root.visits,
+        }
+        global _mcts_stats
+        _mcts_stats = dict(self.stats)
+
+        if reuse_tree:
+            _keep_tree(self._cache_key(game), (list(game.move_history), root))
+
+        legal = {root_board.point(row, col) for row, col in valid_moves}
+        return {
+            root_board.coordinates(child.move): child.visits
+            for child in root.children
+            if child.move in legal
+        }
+
+    def ponder(self, game: GoGame, deadline: float) -> int:
+        """Grow the cached tree below our last move while the opponent thinks.
+
+        `game` is the position right after our move. The next search finds
+        the opponent's reply in the same tree and starts from its visits.
+        Returns the number of playouts run.
+        """
+        # The tree is taken out of the cache while it grows, so no search
+        # on another thread can pick it up halfway
+        key = self._cache_key(game)
+        cached = _take_tree(key)
+        if cached is None:
+            return 0
+        try:
+            return self._ponder_tree(game, cached[0], cached[1], deadline)
+        finally:
+            # A search that stored a newer tree meanwhile wins
+            _keep_tree(key, cached, replace=False)
+
+    def _ponder_tree(
+        self, game: GoGame, history: list, root: _MCTSNode, deadline: float
+    ) -> int:
+        if not game.move_history:
+            return 0
+        last = game.move_history[-1]
+        if last is None or game.move_history[:-1] != history:
+            return 0
+        row, col, player = last
+        point = (row + 1) * (game.board_size + 2) + col + 1
+        node = next(
+            (
+                child
+                for child in root.children
+                if child.move == point and child.player == player.value
+            ),
+            None,
+        )
+        if node is None:
+            return 0
+
+        board = PlayoutBoard.from_game(game)
+        playouts = 0
+        while not (self.cancel is not None and self.cancel.is_set()):
+            if playouts % 16 == 0 and time.monotonic() >= deadline:
+                break
+            self._run_playout(node, board.copy())
+            playouts += 1
+        return playouts
+
+    def _run_playout(self, root: _MCTSNode, board: PlayoutBoard):
+        """One selection, expansion, simulation and backpropagation pass"""
+        node = root
+        while node.untried is not None and not node.untried and node.children:
+            node = self._select_child(node)
+            board.play(node.move, node.player)
+
+        to_move = 3 - node.player
+        if node.untried is None:
+            node.untried = [
+                point for point in board.empties if not board.is_eye(point, to_move)
+            ]
+        while node.untried:
+            index = self.rng.randrange(len(node.untried))
+            node.untried[index], node.untried[-1] = (
+                node.untried[-1],
+                node.untried[index],
+            )
+            move = node.untried.pop()
+            if board.is_legal(move, to_move):
+                board.play(move, to_move)
+                child = _MCTSNode(move, to_move, node)
+                node.children.append(child)
+                node = child
+                break
+
+        board.playout(3 - node.player, self.rng)
+        winner = BLACK if board.area_score(self.komi) > 0 else WHITE
+
+        while node is not None:
+            node.visits += 1
+            if node.player == winner:
+                node.wins += 1
+            node = node.parent
+
+    def _select_child(self, node: _MCTSNode) -> _MCTSNode:
+        """UCB1: win rate plus an exploration bonus for rarely visited moves"""
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(
+            node.children,
+            key=lambda child: (
+                child.wins / child.visits
+                + exploration * math.sqrt(log_visits / child.visits)
+            ),
+        )
+
+    def _cache_key(self, game: GoGame) -> TreeKey:
+        return (self.game_id, game.board_size, self.player.value)
+
+    def _reuse_tree(self, game: GoGame) -> Optional[_MCTSNode]:
+        """Find the current position in the previous search tree, if any"""
+        cached = _take_tree(self._cache_key(game))
+        if cached is None:
+            return None
+        history, root = cached
+        if game.move_history[: len(history)] != history:
+            return None
+
+        stride = game.board_size + 2
+        node = root
+        for entry in game.move_history[len(history) :]:
+            if entry is None:
+                return None  # Passes are not part of the tree
+            row, col, player = entry
+            point = (row + 1) * stride + col + 1
+            node = next(
+                (
+                    child
+                    for child in node.children
+                    if child.move == point and child.player == player.value
+                ),
+                None,
+            )
+            if node is None:
+                return None
+        if node is root:
+            return None  # Same position, but our previous move was not played
+        node.parent = None
+        return node
 
 
 class GoAI:
     """AI opponent for Go game with different difficulty levels"""
 
-    def __init__(self, difficulty: str = "medium", player: Player = Player.WHITE):
+    def __init__(
+        self,
+        difficulty: str = "medium",
+        player: Player = Player.WHITE,
+        table: Optional[TranspositionTable] = None,
+        parallel: Optional["ParallelSearch"] = None,
+        game_id: Optional[str] = None,
+    ):
         self.difficulty = difficulty.lower()
         self.player = player
         self.opponent = Player.BLACK if player == Player.WHITE else Player.WHITE
+        self.table = table if table is not None else transposition_table
+        # Optional process pool that splits the root search across cores
+        self.parallel = parallel
+        # The game searched, which MCTS keeps its reusable tree under
+        self.game_id = game_id
+        # Set from another thread to stop a search early
+        self.cancel: Optional[threading.Event] = None
+        # Score all candidates in one whole-board pass when numpy is there
+        self.batch = batch_available()
 
         # Difficulty settings
         self.settings = {
             "easy": {
                 "search_depth": 1,
+                "search_width": 4,
                 "capture_weight": 1.0,
                 "territory_weight": 0.3,
                 "liberty_weight": 0.5,
@@ -23,6 +362,7 @@ class GoAI:
             },
             "medium": {
                 "search_depth": 2,
+                "search_width": 6,
                 "capture_weight": 1.2,
                 "territory_weight": 0.6,
                 "liberty_weight": 0.8,
@@ -30,137 +370,489 @@ class GoAI:
             },
             "hard": {
                 "search_depth": 3,
+                "search_width": 8,
                 "capture_weight": 1.5,
                 "territory_weight": 1.0,
                 "liberty_weight": 1.0,
                 "random_factor": 0.1,
             },
+            # Monte Carlo tree search; the weights are not used
+            "expert": {
+                "engine": "mcts",
+                "search_depth": 1,
+                "search_width": 8,
+                "capture_weight": 1.5,
+                "territory_weight": 1.0,
+                "liberty_weight": 1.0,
+                "random_factor": 0.0,
+                "max_playouts": 20000,
+                "time_limit": 5.0,
+            },
         }
 
         self.config = self.settings.get(difficulty, self.settings["medium"])
 
-    def get_move(self, game: GoGame) -> Optional[Tuple[int, int]]:
-        """Get the AI's next move"""
-        # First check if AI should pass
-        if self.should_pass(game):
-            return None
+        # Statistics of the last search
+        self.nodes_searched = 0
+        self.completed_depth = 0
+        self.search_stats: Dict[str, float] = {}
+
+    def get_move(
+        self,
+        game: GoGame,
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[Tuple[int, int]]:
+        """Get the AI's next move.
+
+        `deadline` is a time.monotonic() timestamp. The search stops there, or
+        as soon as `cancel` is set, and plays the best move found so far.
+        """
+        self.cancel = cancel
+        self.search_stats = {}
+
+        # Book moves are played without looking at anything else
+        book = book_moves(game) if game.current_player == self.player else []
+        if book:
+            self.search_stats = {"book_moves": float(len(book))}
+            return self._add_randomness([move for move, _ in book])
 
         valid_moves = self._get_valid_moves(game)
 
+        # First check if AI should pass
+        if self.should_pass(game, valid_moves):
+            return None
+
         if not valid_moves:
             return None  # Pass turn
 
+        # Points settled as our own territory gain nothing and filling them
+        # can destroy eyes, so they are not searched
+        own = 1.0 if self.player == Player.BLACK else -1.0
+        ownership = game.estimate().ownership
+        valid_moves = [
+            (row, col) for row, col in valid_moves if ownership[row][col] != own
+        ] or valid_moves
+
         # Early game: Play on corners or edges
-        if len(game.move_history) < 10:
+        if len(game.move_history) < OPENING_MOVES:
             corner_moves = self._get_corner_moves(game, valid_moves)
             if corner_moves:
                 return self._add_randomness(corner_moves)
 
-        # Evaluate all valid moves
+        if self.config.get("engine") == "mcts":
+            if self.parallel is not None:
+                return self.parallel.mcts_move(self, game, valid_moves, deadline)
+            engine = MCTSEngine(
+                self.player,
+                max_playouts=self.config["max_playouts"],
+                time_limit=self.config["time_limit"],
+                cancel=cancel,
+                game_id=self.game_id,
+            )
+            move = engine.search(game, valid_moves, deadline)
+            self.search_stats = engine.stats
+            return move
+
+        # Reuse the scores if this position has been searched deep enough
+        key = self._table_key(game)
+        entry = self.table.get(key)
+        if (
+            entry is not None
+            and entry.move_scores is not None
+            and entry.depth >= self.config["search_depth"]
+        ):
+            legal = set(valid_moves)
+            move_scores = [item for item in entry.move_scores if item[0] in legal]
+        else:
+            if self.parallel is not None:
+                move_scores, depth = self.parallel.search(
+                    self, game, valid_moves, deadline
+                )
+            else:
+                move_scores, depth = self._search(game, valid_moves, deadline)
+            # A search stopped by the deadline or a cancel may have scored
+            # only some moves at depth 1; a deeper completed iteration means
+            # depth 1 finished, so its scores cover every move
+            if move_scores and (depth > 1 or not self._stopped(deadline)):
+                self.table.store(
+                    key,
+                    TTEntry(
+                        depth=depth,
+                        score=move_scores[0][1],
+                        flag=EXACT,
+                        best_move=move_scores[0][0],
+                        move_scores=move_scores,
+                    ),
+                )
+
+        if not move_scores:
+            return None  # No valid moves could be evaluated
+
+        # Add some randomness based on difficulty
+        top_moves = self._select_top_moves(move_scores)
+        return self._add_randomness(top_moves)
+
+    def ponder(
+        self,
+        game: GoGame,
+        deadline: float,
+        cancel: Optional[threading.Event] = None,
+    ) -> List[Hashable]:
+        """Search ahead while the opponent is to move in `game`.
+
+        The alpha-beta levels search our answer to each of the opponent's
+        PONDER_REPLIES best-scored replies, leaving the results in the
+        transposition table where get_move finds them once that reply is
+        played. MCTS grows its cached tree instead. Returns the table keys
+        of the positions searched. `game` is played on and taken back.
+        """
+        self.cancel = cancel
+        if self.config.get("engine") == "mcts":
+            MCTSEngine(self.player, cancel=cancel, game_id=self.game_id).ponder(
+                game, deadline
+            )
+            return []
+
+        replies = self._score_moves(
+            game, self._get_valid_moves(game, self.opponent), player=self.opponent
+        )
+        keys = []
+        for (row, col), _ in replies[:PONDER_REPLIES]:
+            if self._stopped(deadline) or not game.play(row, col, self.opponent):
+                break
+            try:
+                key = self._table_key(game)
+                keys.append(key)
+                self.get_move(game, deadline=deadline, cancel=cancel)
+                if self._stopped(deadline):
+                    # An interrupted search may have stored a partial result
+                    self.table.discard(key)
+            finally:
+                game.undo()
+        return keys
+
+    def _table_key(
+        self, game: GoGame, player: Optional[Player] = None, node: bool = False
+    ) -> Hashable:
+        """Transposition table key: position, side to move and weights.
+
+        Root entries (with every candidate's score) and interior search nodes
+        are kept apart.
+        """
+        key = (
+            game.zobrist_key(player or self.player),
+            game.board_size,
+            self.difficulty,
+        )
+        return key + ("node",) if node else key
+
+    def _search(
+        self,
+        game: GoGame,
+        valid_moves: List[Tuple[int, int]],
+        deadline: Optional[float] = None,
+    ) -> Tuple[List[Tuple[Tuple[int, int], float]], int]:
+        """Iterative-deepening alpha-beta search up to the search_depth setting.
+
+        Depth 1 is the static score of every move. Each deeper iteration
+        re-scores the best `search_width` root moves as their static score
+        minus the opponent's best reply value. On timeout the last completed
+        iteration is kept. Returns the root moves best first and the depth
+        they were searched to.
+        """
+        self.nodes_searched = 0
+        move_scores = self._score_moves(game, valid_moves, deadline=deadline)
+        static_scores = dict(move_scores)
+        self.completed_depth = 1
+
+        for depth in range(2, self.config["search_depth"] + 1):
+            try:
+                move_scores = self._search_root(
+                    game, move_scores, static_scores, depth, deadline
+                )
+            except SearchTimeout:
+                break
+            self.completed_depth = depth
+
+        return move_scores, self.completed_depth
+
+    def _search_root(
+        self,
+        game: GoGame,
+        move_scores: List[Tuple[Tuple[int, int], float]],
+        static_scores: Dict[Tuple[int, int], float],
+        depth: int,
+        deadline: Optional[float],
+    ) -> List[Tuple[Tuple[int, int], float]]:
+        """Search the most promising root moves `depth` plies deep"""
+        ordered = self._order_moves(game, move_scores, self.player)
+        width = self.config["search_width"]
+
+        # Every root move gets a full window so the top moves can be ranked
+        searched = []
+        for move, _ in ordered[:width]:
+            row, col = move
+            if not game.play(row, col, self.player):
+                continue
+            try:
+                reply = self._negamax(
+                    game,
+                    self.opponent,
+                    depth - 1,
+                    -float("inf"),
+                    float("inf"),
+                    deadline,
+                )
+            finally:
+                game.undo()
+            searched.append((move, static_scores[move] - reply))
+
+        searched.sort(key=lambda x: x[1], reverse=True)
+        return searched + ordered[width:]
+
+    def _negamax(
+        self,
+        game: GoGame,
+        player: Player,
+        depth: int,
+        alpha: float,
+        beta: float,
+        deadline: Optional[float],
+    ) -> float:
+        """Value of the position for `player` to move, searched `depth` plies"""
+        self.nodes_searched += 1
+        if self._stopped(deadline):
+            raise SearchTimeout()
+
+        original_alpha = alpha
+        key = self._table_key(game, player, node=True)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry.best_move
+            if entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return entry.score
+                if entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                elif entry.flag == UPPER_BOUND:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.score
+
+        move_scores = self._score_moves(
+            game, self._get_valid_moves(game, player), player=player
+        )
+        if not move_scores:
+            return 0.0  # Nothing to play but a pass
+
+        if depth <= 1:
+            best_move, best = move_scores[0]
+            self.table.store(key, TTEntry(1, best, EXACT, best_move))
+            return best
+
+        opponent = Player.WHITE if player == Player.BLACK else Player.BLACK
+        best = -float("inf")
+        best_move = None
+        ordered = self._order_moves(game, move_scores, player, tt_move)
+        for move, score in ordered[: self.config["search_width"]]:
+            row, col = move
+            if not game.play(row, col, player):
+                continue
+            try:
+                # value = score - reply, so the reply window is shifted by score
+                reply = self._negamax(
+                    game, opponent, depth - 1, score - beta, score - alpha, deadline
+                )
+            finally:
+                game.undo()
+            value = score - reply
+            if value > best:
+                best, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = UPPER_BOUND
+        elif best >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.table.store(key, TTEntry(depth, best, flag, best_move))
+        return best
+
+    def _stopped(self, deadline: Optional[float]) -> bool:
+        """True once the deadline has passed or the search was cancelled"""
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        return deadline is not None and time.monotonic() >= deadline
+
+    def _order_moves(
+        self,
+        game: GoGame,
+        move_scores: List[Tuple[Tuple[int, int], float]],
+        player: Player,
+        tt_move: Optional[Tuple[int, int]] = None,
+    ) -> List[Tuple[Tuple[int, int], float]]:
+        """Order moves for search: table move, captures, ataris, then score"""
+        return sorted(
+            move_scores,
+            key=lambda item: (
+                item[0] == tt_move,
+                self._tactical_priority(game, item[0], player),
+                item[1],
+            ),
+            reverse=True,
+        )
+
+    def _tactical_priority(
+        self, game: GoGame, move: Tuple[int, int], player: Player
+    ) -> int:
+        """2 for a capture or a working ladder, 1 for another atari or saving
+        a chain in atari, else 0"""
+        row, col = move
+        if game.count_captures(row, col, player):
+            return 2
+        priority = 0
+        for neighbor_row, neighbor_col in game.get_neighbors(row, col):
+            color = game.board[neighbor_row][neighbor_col]
+            if color == Player.EMPTY:
+                continue
+            liberties = len(game.liberties_at(neighbor_row, neighbor_col))
+            if color == player and liberties == 1:
+                priority = 1
+            elif color != player and liberties == 2:
+                if ladder_after(game, row, col, player, (neighbor_row, neighbor_col)):
+                    return 2
+                priority = 1
+        return priority
+
+    def _score_moves(
+        self,
+        game: GoGame,
+        valid_moves: List[Tuple[int, int]],
+        player: Optional[Player] = None,
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[Tuple[int, int], float]]:
+        """Evaluate every valid move, best first.
+
+        Stops early at `deadline`, keeping the moves scored so far. With
+        numpy every move is scored in one batch instead.
+        """
+        if self.batch and valid_moves:
+            scores = evaluate_moves(
+                game,
+                valid_moves,
+                player or self.player,
+                self.config["capture_weight"],
+                self.config["liberty_weight"],
+                self.config["territory_weight"],
+            )
+            move_scores = list(zip(valid_moves, scores))
+            move_scores.sort(key=lambda x: x[1], reverse=True)
+            return move_scores
+
         move_scores = []
         for move in valid_moves:
+            if move_scores and self._stopped(deadline):
+                break
             try:
-                score = self._evaluate_move(game, move)
+                score = self._evaluate_move(game, move, player)
                 move_scores.append((move, score))
             except Exception as e:
                 # Skip moves that cause evaluation errors
                 print(f"Error evaluating move {move}: {e}")
                 continue
 
-        if not move_scores:
-            return None  # No valid moves could be evaluated
-
         # Sort by score (highest first)
         move_scores.sort(key=lambda x: x[1], reverse=True)
+        return move_scores
 
-        # Add some randomness based on difficulty
-        top_moves = self._select_top_moves(move_scores)
-        return self._add_randomness(top_moves)
-
-    def _get_valid_moves(self, game: GoGame) -> List[Tuple[int, int]]:
+    def _get_valid_moves(
+        self, game: GoGame, player: Optional[Player] = None
+    ) -> List[Tuple[int, int]]:
         """Get all valid moves for current position"""
-        valid_moves = []
-        for row in range(game.board_size):
-            for col in range(game.board_size):
-                if game.board[row][col] == Player.EMPTY:
-                    # Test if move is legal
-                    if not game.is_suicide_move(
-                        row, col, self.player
-                    ) and not game.violates_ko(row, col):
-                        valid_moves.append((row, col))
-        return valid_moves
+        legal = game.legal_moves(player or self.player)
+        return [
+            divmod(index, game.board_size)
+            for index, is_legal in enumerate(legal)
+            if is_legal
+        ]
 
     def _get_corner_moves(
         self, game: GoGame, valid_moves: List[Tuple[int, int]]
     ) -> List[Tuple[int, int]]:
         """Get corner and edge moves for opening play"""
-        board_size = game.board_size
-
-        # Corners and near-corner positions
-        corner_positions = {
-            (3, 3),
-            (3, board_size - 4),
-            (board_size - 4, 3),
-            (board_size - 4, board_size - 4),
-            (2, 3),
-            (3, 2),
-            (2, board_size - 4),
-            (3, board_size - 3),
-            (board_size - 3, 3),
-            (board_size - 4, 2),
-            (board_size - 3, board_size - 4),
-            (board_size - 4, board_size - 3),
-        }
-
+        corner_positions = geometry(game.board_size).corner_moves
         return [move for move in valid_moves if move in corner_positions]
 
-    def _evaluate_move(self, game: GoGame, move: Tuple[int, int]) -> float:
-        """Evaluate a potential move and return a score"""
-        row, col = move
-
-        # Create a temporary game state to test the move
-        temp_game = copy.deepcopy(game)
-        temp_game.current_player = self.player
-        temp_game.make_move(row, col)
-
+    def _evaluate_move(
+        self, game: GoGame, move: Tuple[int, int], player: Optional[Player] = None
+    ) -> float:
+        """Evaluate a potential move for `player` (the AI by default)"""
         score = 0.0
+        for value in self._evaluate_terms(game, move, player).values():
+            score += value
+        return score
 
-        # 1. Capture evaluation
-        score += (
-            self._evaluate_captures(temp_game, move) * self.config["capture_weight"]
-        )
-
-        # 2. Liberty evaluation
-        score += (
-            self._evaluate_liberties(temp_game, move) * self.config["liberty_weight"]
-        )
-
-        # 3. Territory evaluation
-        score += (
-            self._evaluate_territory(temp_game, move) * self.config["territory_weight"]
-        )
-
-        # 4. Defense evaluation
-        score += self._evaluate_defense(game, move)
+    def _evaluate_terms(
+        self, game: GoGame, move: Tuple[int, int], player: Optional[Player] = None
+    ) -> Dict[str, float]:
+        """The weighted terms of a move's score by name, in the order
+        _evaluate_move adds them up"""
+        row, col = move
+        player = player or self.player
+
+        # Defense and patterns look at the position before the move
+        defense = self._evaluate_defense(game, move, player)
+        patterns = self._evaluate_patterns(game, move, player)
+
+        # Play the move in place; it is taken back once it has been scored
+        played = game.play(row, col, player)
+
+        terms = {
+            "capture": self._evaluate_captures(game, move, player)
+            * self.config["capture_weight"],
+            "liberty": self._evaluate_liberties(game, move)
+            * self.config["liberty_weight"],
+            "territory": self._evaluate_territory(game, move)
+            * self.config["territory_weight"],
+        }
 
-        # 5. Pattern evaluation
-        score += self._evaluate_patterns(game, move)
+        if played:
+            game.undo()
 
-        return score
+        terms["defense"] = defense
+        terms["pattern"] = patterns
+        return terms
 
-    def _evaluate_captures(self, temp_game: GoGame, move: Tuple[int, int]) -> float:
+    def _evaluate_captures(
+        self,
+        temp_game: GoGame,
+        move: Tuple[int, int],
+        player: Optional[Player] = None,
+    ) -> float:
         """Evaluate capture potential of a move"""
         row, col = move
         score = 0.0
+        player = player or self.player
+        opponent = Player.WHITE if player == Player.BLACK else Player.BLACK
 
         # Look for immediate captures
         for neighbor_row, neighbor_col in temp_game.get_neighbors(row, col):
-            if temp_game.board[neighbor_row][neighbor_col] == self.opponent:
+            if temp_game.board[neighbor_row][neighbor_col] == opponent:
                 group = temp_game.get_group(neighbor_row, neighbor_col)
                 liberties = temp_game.get_liberties(group)
 
-                # If opponent group has few liberties, this move is valuable
-                if len(liberties) <= 1:
+                # If opponent group has few liberties, this move is valuable;
+                # an atari the chain runs away from is only a threat
+                if len(liberties) == 1 and not ladder_captured(
+                    temp_game, neighbor_row, neighbor_col
+                ):
+                    score += len(group) * 5
+                elif len(liberties) <= 1:
                     score += len(group) * 10  # High score for capturing
                 elif len(liberties) == 2:
                     score += len(group) * 5  # Medium score for threatening
@@ -192,32 +884,31 @@ class GoAI:
     def _evaluate_territory(self, temp_game: GoGame, move: Tuple[int, int]) -> float:
         """Evaluate territorial influence of move"""
         row, col = move
+        if temp_game.array is not None:
+            return temp_game.array.influence_at(row, col)
+
         score = 0.0
 
         # Simple territory evaluation: count empty spaces we influence
-        influence_radius = 3
-        for dr in range(-influence_radius, influence_radius + 1):
-            for dc in range(-influence_radius, influence_radius + 1):
-                new_row, new_col = row + dr, col + dc
-                if (
-                    0 <= new_row < temp_game.board_size
-                    and 0 <= new_col < temp_game.board_size
-                    and temp_game.board[new_row][new_col] == Player.EMPTY
-                ):
-                    distance = abs(dr) + abs(dc)
-                    if distance <= influence_radius:
-                        score += 1.0 / (distance + 1)
+        board = temp_game.board
+        influence = geometry(temp_game.board_size).influence[row][col]
+        for point_row, point_col, weight in influence:
+            if board[point_row][point_col] == Player.EMPTY:
+                score += weight
 
         return score
 
-    def _evaluate_defense(self, game: GoGame, move: Tuple[int, int]) -> float:
+    def _evaluate_defense(
+        self, game: GoGame, move: Tuple[int, int], player: Optional[Player] = None
+    ) -> float:
         """Evaluate defensive value of move"""
         row, col = move
         score = 0.0
+        player = player or self.player
 
         # Check if this move helps defend our groups
         for neighbor_row, neighbor_col in game.get_neighbors(row, col):
-            if game.board[neighbor_row][neighbor_col] == self.player:
+            if game.board[neighbor_row][neighbor_col] == player:
                 group = game.get_group(neighbor_row, neighbor_col)
                 liberties = game.get_liberties(group)
 
@@ -227,32 +918,25 @@ class GoAI:
 
         return score
 
-    def _evaluate_patterns(self, game: GoGame, move: Tuple[int, int]) -> float:
+    def _evaluate_patterns(
+        self, game: GoGame, move: Tuple[int, int], player: Optional[Player] = None
+    ) -> float:
         """Evaluate common Go patterns"""
         row, col = move
-        score = 0.0
+        player = player or self.player
 
         # Avoid playing on first and second lines unless necessary
-        if (
-            row == 0
-            or row == game.board_size - 1
-            or col == 0
-            or col == game.board_size - 1
-        ):
-            score -= 2
-        if (
-            row == 1
-            or row == game.board_size - 2
-            or col == 1
-            or col == game.board_size - 2
-        ):
-            score -= 1
+        score = float(geometry(game.board_size).line_penalty[row][col])
 
         # Prefer playing near existing stones (connection)
         for neighbor_row, neighbor_col in game.get_neighbors(row, col):
-            if game.board[neighbor_row][neighbor_col] == self.player:
+            if game.board[neighbor_row][neighbor_col] == player:
                 score += 2
 
+        # Hane, cuts and other good shape around the point
+        if SHAPE_TABLE[game.pattern_code(row, col)]:
+            score += SHAPE_BONUS
+
         return score
 
     def _select_top_moves(
@@ -284,42 +968,45 @@ class GoAI:
             # Usually pick the first (best) move
             return moves[0]
 
-    def should_pass(self, game: GoGame) -> bool:
-        """Determine if AI should pass instead of making a move"""
-        valid_moves = self._get_valid_moves(game)
+    def should_pass(
+        self, game: GoGame, valid_moves: Optional[List[Tuple[int, int]]] = None
+    ) -> bool:
+        """Determine if AI should pass instead of making a move.
+
+        Passes when passing back ends the game in our favour, when every
+        legal move is inside settled territory (scoring.estimate), or when
+        the few open points left would only put our own stones in atari,
+        as with the shared liberties of a seki.
+        """
+        if valid_moves is None:
+            valid_moves = self._get_valid_moves(game)
 
         # Pass if no valid moves
         if not valid_moves:
             return True
 
-        # Count empty spaces
-        empty_spaces = sum(row.count(Player.EMPTY) for row in game.board)
-        total_spaces = game.board_size * game.board_size
-
-        # If very few moves left, be more likely to pass
-        if empty_spaces < 10:  # Less than 10 empty spaces
-            return True
-
-        # Simple endgame detection: if very few empty spaces and no good moves
-        if empty_spaces / total_spaces < 0.15:  # Less than 15% empty
-            try:
-                # Evaluate if any move is worth more than a threshold
-                best_score = -float("inf")
-                moves_to_check = min(3, len(valid_moves))  # Check fewer moves for speed
-
-                for i, move in enumerate(valid_moves[:moves_to_check]):
-                    try:
-                        score = self._evaluate_move(game, move)
-                        best_score = max(best_score, score)
-                    except Exception as e:
-                        print(f"Error evaluating move {move}: {e}")
-                        continue
-
-                # Lower threshold for passing in endgame
-                if best_score < 1:  # Lower threshold
-                    return True
-            except Exception:
-                # If any error occurs during evaluation, just pass
+        estimate = game.estimate()
+        if game.consecutive_passes:
+            final = area_score(game, dead=estimate.dead)
+            if final.winner == self.player:
                 return True
 
-        return False
+        ownership = estimate.ownership
+        open_moves = [
+            (row, col) for row, col in valid_moves if abs(ownership[row][col]) < 1
+        ]
+        if len(open_moves) > ENDGAME_OPEN_POINTS:
+            return False
+        return all(self._is_self_atari(game, move) for move in open_moves)
+
+    def _is_self_atari(self, game: GoGame, move: Tuple[int, int]) -> bool:
+        """True if playing `move` captures nothing and leaves one liberty"""
+        row, col = move
+        if game.count_captures(row, col, self.player):
+            return False
+        if not game.play(row, col, self.player):
+            return True
+        try:
+            return len(game.get_liberties(game.get_group(row, col))) <= 1
+        finally:
+            game.undo()
@@ -0,0 +1,281 @@
+"""Move analysis: top-k candidates with their score terms, and game reviews.
+
+analyze_position() scores every legal move of the player to move the way
+GoAI does before searching (one batch pass with numpy) and breaks the best
+`top_k` down into the weighted terms of GoAI._evaluate_terms: capture,
+liberty, territory, defense and pattern.
+
+A review annotates every move of a game with the same analysis plus the
+played move's score, rank and loss against the best candidate. Moves are
+played on one GoGame in turn, so each position reuses the chains and
+pattern codes of the one before instead of being rebuilt. AnalysisPool
+splits the moves into chunks of REVIEW_CHUNK for its worker processes;
+each worker replays the moves before its chunk, then annotates it. Single
+positions and the replay of a submitted game run on the same workers, so
+the server process does no analysis work itself.
+
+Reviewing from backend/:
+    python analysis.py game.sgf --difficulty hard --top-k 3
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import multiprocessing
+import os
+
+from ai_opponent import GoAI
+from go_game import GoGame, Player
+from sgf import read_games, replay
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 50
+
+# Moves per review job of an AnalysisPool
+REVIEW_CHUNK = 25
+
+Move = Tuple[int, int]
+# A move or pass (None) and who played it
+Record = Tuple[Optional[Move], int]
+
+
+def _rounded(terms: Dict[str, float]) -> Dict[str, float]:
+    return {name: round(value, 2) for name, value in terms.items()}
+
+
+def _scores(ai: GoAI, game: GoGame) -> List[Tuple[Move, float]]:
+    return ai._score_moves(game, ai._get_valid_moves(game), ai.player)
+
+
+def _top(
+    ai: GoAI, game: GoGame, move_scores: List[Tuple[Move, float]], top_k: int
+) -> List[Dict]:
+    return [
+        {
+            "move": list(move),
+            "score": round(score, 2),
+            "terms": _rounded(ai._evaluate_terms(game, move, ai.player)),
+        }
+        for move, score in move_scores[:top_k]
+    ]
+
+
+def analyze_position(
+    game: GoGame, difficulty: str = "medium", top_k: int = DEFAULT_TOP_K
+) -> Dict:
+    """The best `top_k` moves for the player to move, with their terms.
+
+    The game is played on and restored, so pass a copy of a shared one.
+    """
+    ai = GoAI(difficulty, player=game.current_player)
+    move_scores = _scores(ai, game)
+    return {
+        "player": game.current_player.value,
+        "legal_moves": len(move_scores),
+        "candidates": _top(ai, game, move_scores, top_k),
+    }
+
+
+def game_records(game: GoGame) -> Tuple[GoGame, List[Record]]:
+    """The starting position of a game and every move and pass since,
+    taken from its undo records; setup stones stay in the start"""
+    start = game.copy()
+    records = []
+    while start._undo_stack:
+        record = start._undo_stack[-1]
+        records.append((record.move, record.player.value))
+        start.undo()
+    records.reverse()
+    return start, records
+
+
+def load_review(
+    sgf: Optional[str], moves: Optional[List[Optional[List[int]]]], board_size: int
+) -> Tuple[int, bytes, List[Record]]:
+    """Board size, compact starting position and records of a game given
+    as SGF text or as moves from an empty board; ValueError if a move is
+    illegal or the SGF is broken"""
+    if sgf is not None:
+        game = GoGame.from_sgf(sgf)
+    else:
+        if not 2 <= board_size <= 25:
+            raise ValueError(f"Unsupported board size: {board_size}")
+        game = GoGame(board_size)
+        for number, move in enumerate(moves or [], 1):
+            if move is None:
+                game.pass_turn()
+            elif len(move) != 2 or not game.make_move(move[0], move[1]):
+                raise ValueError(f"Illegal move {number}: {move}")
+    start, records = game_records(game)
+    return start.board_size, start.to_compact(), records
+
+
+def load_history(board_size: int, history: bytes) -> Tuple[int, bytes, List[Record]]:
+    """load_review() for a game given as GoGame.history_bytes()"""
+    start, records = game_records(GoGame.from_history_bytes(board_size, history))
+    return board_size, start.to_compact(), records
+
+
+def _replay(game: GoGame, record: Record):
+    move, player = record
+    if move is None:
+        game.current_player = Player(player)
+        game._pass()
+    elif not game.play(move[0], move[1], Player(player)):
+        raise ValueError(f"Illegal move at {move}")
+
+
+def annotate(
+    game: GoGame,
+    records: List[Record],
+    difficulty: str = "medium",
+    top_k: int = DEFAULT_TOP_K,
+    first: int = 1,
+) -> List[Dict]:
+    """Annotate `records` played from `game`'s position, numbered from
+    `first`; the game is left after the last of them"""
+    ais = {
+        player: GoAI(difficulty, player=player)
+        for player in (Player.BLACK, Player.WHITE)
+    }
+    annotations = []
+    for number, record in enumerate(records, first):
+        move, player = record
+        ai = ais[Player(player)]
+        move_scores = _scores(ai, game)
+        annotation = {
+            "move_number": number,
+            "player": player,
+            "move": list(move) if move is not None else None,
+            "candidates": _top(ai, game, move_scores, top_k),
+        }
+        scores = dict(move_scores)
+        if move in scores:
+            score = scores[move]
+            annotation.update(
+                score=round(score, 2),
+                rank=1 + sum(1 for _, other in move_scores if other > score),
+                loss=round(move_scores[0][1] - score, 2),
+                terms=_rounded(ai._evaluate_terms(game, move, ai.player)),
+            )
+        annotations.append(annotation)
+        _replay(game, record)
+    return annotations
+
+
+def _analyze_compact(compact: bytes, difficulty: str, top_k: int) -> Dict:
+    return analyze_position(GoGame.from_compact(compact), difficulty, top_k)
+
+
+def _annotate_chunk(
+    compact: bytes,
+    records: List[Record],
+    start: int,
+    difficulty: str,
+    top_k: int,
+) -> List[Dict]:
+    """Annotate records[start:] in a worker, after replaying those before"""
+    game = GoGame.from_compact(compact)
+    for record in records[:start]:
+        _replay(game, record)
+    return annotate(game, records[start:], difficulty, top_k, start + 1)
+
+
+class AnalysisPool:
+    """Process pool that analyzes positions and reviews the moves of a game
+    in chunks"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Spawned rather than forked, like parallel_search
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.analyses = 0
+        self.reviews = 0
+        self.moves = 0
+
+    def analyze(
+        self, game: GoGame, difficulty: str = "medium", top_k: int = DEFAULT_TOP_K
+    ) -> Future:
+        """Start analyze_position() on the game's current position"""
+        self.analyses += 1
+        return self.executor.submit(
+            _analyze_compact, game.to_compact(), difficulty, top_k
+        )
+
+    def load(
+        self,
+        sgf: Optional[str],
+        moves: Optional[List[Optional[List[int]]]],
+        board_size: int = 19,
+    ) -> Future:
+        """Start load_review() on a worker"""
+        return self.executor.submit(load_review, sgf, moves, board_size)
+
+    def load_game(self, game: GoGame) -> Future:
+        """Start load_history() on a worker for the moves of `game`"""
+        return self.executor.submit(load_history, game.board_size, game.history_bytes())
+
+    def review(
+        self,
+        compact: bytes,
+        records: List[Record],
+        difficulty: str = "medium",
+        top_k: int = DEFAULT_TOP_K,
+    ) -> List[Future]:
+        """Start annotating `records` played from the to_compact() position;
+        each future resolves to the annotations of one chunk, in order"""
+        self.reviews += 1
+        self.moves += len(records)
+        return [
+            self.executor.submit(
+                _annotate_chunk,
+                compact,
+                records[: start + REVIEW_CHUNK],
+                start,
+                difficulty,
+                top_k,
+            )
+            for start in range(0, len(records), REVIEW_CHUNK)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "analyses": self.analyses,
+            "reviews": self.reviews,
+            "moves": self.moves,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotate the moves of SGF games")
+    parser.add_argument("sgf", help="SGF file or collection")
+    parser.add_argument("--difficulty", default="medium")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pool = AnalysisPool(args.workers)
+    try:
+        with open(args.sgf) as sgf_file:
+            for record in read_games(sgf_file):
+                start, records = game_records(replay(record))
+                futures = pool.review(
+                    start.to_compact(), records, args.difficulty, args.top_k
+                )
+                for future in futures:
+                    for annotation in future.result():
+                        print(json.dumps(annotation))
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Score every candidate move of a position in one whole-board pass.
+
+GoAI._evaluate_move plays each candidate, runs the five evaluation terms
+and takes the move back. evaluate_moves() computes the same scores for all
+candidates at once from the position before any move, using the chain
+bookkeeping of GoGame:
+
+- patterns: the geometry line penalty plus 2 per friendly neighbor, plus
+  the shape bonus when the point's pattern code is in the shape table
+- defense: 8 x size per neighbor chain of ours with at most 2 liberties
+- captures: after the move an adjacent enemy chain has one liberty less,
+  so chains with 2 (3) liberties score 10 (5) x size per neighbor, and
+  chains with 1 are captured and score nothing. Ataris are played out and
+  the ladder read, as a chain that runs away scores 5 x size
+- territory: the influence kernel summed over empty points by convolution,
+  leaving out the move's own point
+- liberties: the empty-neighbor count for a lone stone; candidates that
+  join a chain or capture are counted exactly with set unions
+
+Terms are added in the order _evaluate_move adds them, and territory sums
+its kernel in the same order, so the scores are identical to the per-move
+path on the list board. Needs numpy; GoAI falls back to _evaluate_move
+without it.
+"""
+
+from typing import List, Optional, Tuple
+
+from board_array import influence_kernel
+from geometry import INFLUENCE_RADIUS, geometry
+from go_game import GoGame, Player
+from patterns import SHAPE_BONUS, SHAPE_TABLE, ladder_after
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+# _evaluate_liberties by liberty count, 4 standing for 4 or more
+_LIBERTY_SCORES = (0, -5, -1, 1, 3)
+
+
+def batch_available() -> bool:
+    return np is not None
+
+
+def _neighbor_sum(values):
+    """Sum of each point's on-board neighbors, added in get_neighbors order"""
+    size = values.shape[0]
+    padded = np.zeros((size + 2, size + 2), dtype=values.dtype)
+    padded[1:-1, 1:-1] = values
+    total = np.zeros_like(values)
+    for dr, dc in _DIRECTIONS:
+        total = total + padded[1 + dr : 1 + dr + size, 1 + dc : 1 + dc + size]
+    return total
+
+
+def _influence_map(empty):
+    """Kernel-weighted empty points around each point, the point excluded.
+
+    This is ArrayBoard.influence_at for every point after a stone is
+    placed there, with the terms added in the list board's order.
+    """
+    size = empty.shape[0]
+    radius = INFLUENCE_RADIUS
+    kernel = influence_kernel(radius)
+    padded = np.zeros((size + 2 * radius, size + 2 * radius), dtype=np.float64)
+    padded[radius:-radius, radius:-radius] = empty
+    influence = np.zeros((size, size), dtype=np.float64)
+    for dr in range(-radius, radius + 1):
+        for dc in range(-radius, radius + 1):
+            distance = abs(dr) + abs(dc)
+            if distance <= radius and distance:
+                window = padded[
+                    radius + dr : radius + dr + size, radius + dc : radius + dc + size
+                ]
+                influence += kernel[radius + dr, radius + dc] * window
+    return influence
+
+
+def evaluate_moves(
+    game: GoGame,
+    moves: List[Tuple[int, int]],
+    player: Player,
+    capture_weight: float,
+    liberty_weight: float,
+    territory_weight: float,
+) -> List[float]:
+    """Scores of legal `moves` for `player`, as GoAI._evaluate_move gives them"""
+    size = game.board_size
+    shape = (size, size)
+    board = game.board
+    opponent = Player.WHITE if player == Player.BLACK else Player.BLACK
+    geo = geometry(size)
+
+    # Per-stone size and liberty count of its chain, and the chain itself
+    chain_size = np.zeros(shape, dtype=np.int64)
+    chain_liberties = np.zeros(shape, dtype=np.int64)
+    chain_at = [[None] * size for _ in range(size)]
+    for chain in game.chains():
+        _, stones, liberties = chain
+        rows, cols = zip(*stones)
+        chain_size[rows, cols] = len(stones)
+        chain_liberties[rows, cols] = len(liberties)
+        for row, col in stones:
+            chain_at[row][col] = chain
+
+    if game.array is not None:
+        cells = game.array.cells
+    else:
+        cells = np.array(
+            [[cell.value for cell in board_row] for board_row in board], dtype=np.int8
+        )
+    ours = cells == player.value
+    theirs = cells == opponent.value
+    empty = cells == Player.EMPTY.value
+
+    patterns = np.array(geo.line_penalty, dtype=np.int64) + 2 * _neighbor_sum(
+        ours.astype(np.int64)
+    )
+    defense = _neighbor_sum(np.where(ours & (chain_liberties <= 2), 8 * chain_size, 0))
+    captures = _neighbor_sum(
+        np.where(theirs & (chain_liberties == 2), 10 * chain_size, 0)
+        + np.where(theirs & (chain_liberties == 3), 5 * chain_size, 0)
+    )
+    ataris = _neighbor_sum((theirs & (chain_liberties == 2)).astype(np.int64))
+    in_atari = _neighbor_sum((theirs & (chain_liberties == 1)).astype(np.int64))
+    joins = _neighbor_sum(ours.astype(np.int64))
+    territory = _influence_map(empty)
+    liberties = np.array(_LIBERTY_SCORES, dtype=np.int64)[
+        _neighbor_sum(empty.astype(np.int64))
+    ]
+
+    rows = np.fromiter((row for row, _ in moves), dtype=np.intp, count=len(moves))
+    cols = np.fromiter((col for _, col in moves), dtype=np.intp, count=len(moves))
+    liberty_scores = liberties[rows, cols]
+    territory_scores = territory[rows, cols]
+    capture_scores = captures[rows, cols]
+    shape_scores = np.array(
+        [SHAPE_TABLE[game.pattern_code(row, col)] for row, col in moves],
+        dtype=np.int64,
+    )
+
+    # Joining a chain or capturing changes the new chain's liberties (and a
+    # capture the empty points nearby), so those candidates are done exactly
+    for index in np.flatnonzero(joins[rows, cols] | in_atari[rows, cols]):
+        row, col = moves[index]
+        liberty_scores[index], territory = _after_move(
+            game, chain_at, geo, row, col, player
+        )
+        if territory is not None:
+            territory_scores[index] = territory
+
+    # Reading a ladder plays on the game, which replaces the chain sets that
+    # chain_at holds, so it comes after everything that uses them
+    for index in np.flatnonzero(ataris[rows, cols]):
+        row, col = moves[index]
+        capture_scores[index] -= _escapes(game, row, col, player, opponent)
+
+    score = capture_scores * capture_weight
+    score = score + liberty_scores * liberty_weight
+    score = score + territory_scores * territory_weight
+    score = score + defense[rows, cols]
+    score = score + (patterns[rows, cols] + shape_scores * SHAPE_BONUS)
+    return score.tolist()
+
+
+def _after_move(game, chain_at, geo, row, col, player) -> Tuple[int, Optional[float]]:
+    """Liberty score and territory of a move that joins chains or captures.
+
+    Territory is None without a capture: the influence map is still right.
+    """
+    board = game.board
+    neighbors = geo.neighbors
+    group = {(row, col)}
+    liberties = set()
+    captured = set()
+    for neighbor_row, neighbor_col in neighbors[row][col]:
+        chain = chain_at[neighbor_row][neighbor_col]
+        if chain is None:
+            liberties.add((neighbor_row, neighbor_col))
+        elif chain[0] == player:
+            group |= chain[1]
+            liberties |= chain[2]
+        elif len(chain[2]) == 1:
+            captured |= chain[1]
+
+    # Captured stones next to the new chain become its liberties
+    for stone_row, stone_col in captured:
+        for point in neighbors[stone_row][stone_col]:
+            if point in group:
+                liberties.add((stone_row, stone_col))
+                break
+    liberties.discard((row, col))
+    if not captured:
+        return _LIBERTY_SCORES[min(len(liberties), 4)], None
+
+    territory = 0.0
+    for point_row, point_col, weight in geo.influence[row][col]:
+        if (point_row, point_col) == (row, col):
+            continue
+        if (
+            board[point_row][point_col] == Player.EMPTY
+            or (point_row, point_col) in captured
+        ):
+            territory += weight
+    return _LIBERTY_SCORES[min(len(liberties), 4)], territory
+
+
+def _escapes(game, row, col, player, opponent) -> int:
+    """5 x size per neighbor chain put in atari that escapes the ladder"""
+    escaped = 0
+    for neighbor_row, neighbor_col in game.get_neighbors(row, col):
+        if (
+            game.board[neighbor_row][neighbor_col] == opponent
+            and len(game.liberties_at(neighbor_row, neighbor_col)) == 2
+            and not ladder_after(game, row, col, player, (neighbor_row, neighbor_col))
+        ):
+            escaped += 5 * len(game.get_group(neighbor_row, neighbor_col))
+    return escaped
@@ -0,0 +1 @@
+"""Benchmarks for the rules engine and AI. Run from backend/ with python -m."""
@@ -0,0 +1,103 @@
+"""Per-move AI latency as a function of move-history length.
+
+The AI is always asked to move in the same middle-game position; only the
+length of move_history changes (it is padded with earlier entries). Before
+GoAI evaluated candidates with play/undo, every candidate deep-copied the
+history, so latency grew with the game. Both are reported for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.ai_history --board-size 19 --difficulty medium
+"""
+
+import argparse
+import copy
+import random
+import time
+
+from ai_opponent import GoAI
+from go_game import GoGame, Player
+from transposition import TranspositionTable
+
+
+def build_position(board_size: int, moves: int, seed: int) -> GoGame:
+    """Play random legal moves from an empty board"""
+    rng = random.Random(seed)
+    game = GoGame(board_size)
+    played = 0
+    while played < moves:
+        row, col = rng.randrange(board_size), rng.randrange(board_size)
+        if game.make_move(row, col):
+            played += 1
+    return game
+
+
+def time_ai_move(game: GoGame, difficulty: str, repeats: int) -> float:
+    """Average seconds per GoAI.get_move call.
+
+    Every call gets a fresh transposition table; with the shared one, all
+    calls after the first would be answered from the stored search.
+    """
+    elapsed = 0.0
+    for _ in range(repeats):
+        ai = GoAI(
+            difficulty=difficulty,
+            player=game.current_player,
+            table=TranspositionTable(),
+        )
+        start = time.perf_counter()
+        ai.get_move(game)
+        elapsed += time.perf_counter() - start
+    return elapsed / repeats
+
+
+def time_deepcopy(game: GoGame, repeats: int = 20) -> float:
+    """Average seconds for one copy.deepcopy of the game (the old per-candidate cost)"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        copy.deepcopy(game)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--board-size", type=int, default=19)
+    parser.add_argument("--difficulty", default="medium")
+    parser.add_argument("--stones", type=int, default=60)
+    parser.add_argument(
+        "--history",
+        type=int,
+        nargs="+",
+        default=[60, 200, 500, 1000, 2000],
+        help="move_history lengths to measure",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base = build_position(args.board_size, args.stones, args.seed)
+    candidates = sum(
+        1
+        for row in range(args.board_size)
+        for col in range(args.board_size)
+        if base.board[row][col] == Player.EMPTY
+        and not base.is_suicide_move(row, col, base.current_player)
+    )
+
+    print(
+        f"{args.board_size}x{args.board_size}, {args.difficulty}, "
+        f"~{candidates} candidates per move"
+    )
+    print(f"{'history':>8} {'ai move (ms)':>14} {'deepcopy/candidate (ms)':>24}")
+    for length in args.history:
+        game = base.copy()
+        padding = base.move_history * (length // len(base.move_history) + 1)
+        game.move_history = padding[:length]
+
+        random.seed(args.seed)
+        ai_ms = time_ai_move(game, args.difficulty, args.repeats) * 1000
+        copy_ms = time_deepcopy(game) * 1000
+        print(f"{length:>8} {ai_ms:>14.1f} {copy_ms:>24.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""AI move latency against the number of search worker processes.
+
+Every timed move gets a fresh ParallelSearch pool (warmed up before
+timing), whose newly started workers have empty transposition tables, and
+a fresh table in this process, so no move reuses another one's results.
+With workers=1 the search runs in this process without a pool.
+
+Usage (from backend/):
+    python -m benchmarks.parallel_latency --difficulty hard --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import random
+import time
+
+from ai_opponent import GoAI
+from benchmarks.ai_history import build_position
+from parallel_search import ParallelSearch
+from transposition import TranspositionTable
+
+
+def time_ai_move(game, difficulty, workers, repeats, time_limit):
+    """Average seconds per GoAI.get_move call and the last searched depth"""
+    elapsed = 0.0
+    depth = 0
+    for _ in range(repeats):
+        parallel = None
+        if workers > 1:
+            # Workers keep their tables between tasks, so each move starts
+            # a new pool rather than reusing one
+            parallel = ParallelSearch(workers)
+            parallel.warm_up()
+        try:
+            ai = GoAI(
+                difficulty=difficulty,
+                player=game.current_player,
+                table=TranspositionTable(),
+                parallel=parallel,
+            )
+            deadline = None
+            start = time.perf_counter()
+            if time_limit:
+                deadline = time.monotonic() + time_limit
+            ai.get_move(game, deadline=deadline)
+            elapsed += time.perf_counter() - start
+            depth = ai.completed_depth
+        finally:
+            if parallel is not None:
+                parallel.shutdown()
+    return elapsed / repeats, depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--board-size", type=int, default=19)
+    parser.add_argument("--difficulty", default="hard")
+    parser.add_argument("--stones", type=int, default=40)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, os.cpu_count() or 1],
+        help="worker counts to measure",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--time-limit", type=float, default=0.0, help="seconds per move, 0 for none"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    game = build_position(args.board_size, args.stones, args.seed)
+
+    print(
+        f"{args.board_size}x{args.board_size}, {args.difficulty}, "
+        f"{os.cpu_count()} cores available"
+    )
+    print(f"{'workers':>8} {'ai move (ms)':>14} {'depth':>6} {'speedup':>8}")
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        random.seed(args.seed)
+        seconds, depth = time_ai_move(
+            game, args.difficulty, workers, args.repeats, args.time_limit
+        )
+        baseline = baseline or seconds
+        print(
+            f"{workers:>8} {seconds * 1000:>14.1f} {depth:>6} "
+            f"{baseline / seconds:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
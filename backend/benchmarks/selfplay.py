@@ -0,0 +1,180 @@
+"""Headless GoAI self-play across a process pool, one JSON line per game.
+
+Each game pits two AI settings against each other from an empty board
+until both pass or the move limit is reached, and is scored by area with
+komi after taking off the stones scoring.estimate() finds dead. Game i
+is seeded with --seed + i and gets fresh transposition tables, so a run
+is reproducible. With --swap every other game exchanges colors.
+
+Results are written as games finish; a summary with wins per setting and
+games per hour per worker goes to stderr. Use it to measure throughput
+and to check that an engine change did not weaken play.
+
+Usage (from backend/):
+    python -m benchmarks.selfplay --black medium --white hard --games 20
+    python -m benchmarks.selfplay --games 100 --board-size 9 --output runs.jsonl
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from typing import Any, Dict, Optional
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from ai_opponent import GoAI
+from go_game import GoGame, Player
+from scoring import DEFAULT_KOMI, area_score
+from transposition import TranspositionTable
+
+DIFFICULTIES = ["easy", "medium", "hard", "expert"]
+
+
+def make_ai(difficulty: str, player: Player, playouts: Optional[int]) -> GoAI:
+    ai = GoAI(difficulty, player, table=TranspositionTable())
+    if ai.config.get("engine") == "mcts" and playouts is not None:
+        # A fixed playout budget instead of a time limit keeps runs comparable
+        ai.config = dict(ai.config, max_playouts=playouts, time_limit=1e9)
+    return ai
+
+
+def play_game(
+    number: int,
+    black: str,
+    white: str,
+    board_size: int,
+    seed: int,
+    max_moves: int,
+    komi: float,
+    move_time: Optional[float],
+    playouts: Optional[int],
+) -> Dict[str, Any]:
+    """Play one game in a worker and describe the result"""
+    random.seed(seed)
+    game = GoGame(board_size)
+    ais = {
+        Player.BLACK: make_ai(black, Player.BLACK, playouts),
+        Player.WHITE: make_ai(white, Player.WHITE, playouts),
+    }
+    seconds = {Player.BLACK: 0.0, Player.WHITE: 0.0}
+    moves = {Player.BLACK: 0, Player.WHITE: 0}
+    slowest = 0.0
+
+    while not game.game_ended and len(game.move_history) < max_moves:
+        player = game.current_player
+        deadline = time.monotonic() + move_time if move_time else None
+        start = time.perf_counter()
+        move = ais[player].get_move(game, deadline=deadline)
+        elapsed = time.perf_counter() - start
+        seconds[player] += elapsed
+        moves[player] += 1
+        slowest = max(slowest, elapsed)
+        if move is None or not game.play(move[0], move[1], player):
+            game._pass()
+
+    score = area_score(game, komi, dead=game.estimate().dead)
+    margin = score.margin
+    return {
+        "game": number,
+        "seed": seed,
+        "black": black,
+        "white": white,
+        "board_size": board_size,
+        "winner": "black" if margin > 0 else "white" if margin < 0 else "draw",
+        "margin": margin,
+        "black_area": score.black,
+        "white_area": score.white,
+        "moves": len(game.move_history),
+        "passes": game.move_history.count(None),
+        "ended": "passes" if game.game_ended else "move_limit",
+        "captures": {
+            "black": game.captured_stones[Player.BLACK],
+            "white": game.captured_stones[Player.WHITE],
+        },
+        "seconds": seconds[Player.BLACK] + seconds[Player.WHITE],
+        "seconds_per_move": {
+            "black": seconds[Player.BLACK] / max(moves[Player.BLACK], 1),
+            "white": seconds[Player.WHITE] / max(moves[Player.WHITE], 1),
+        },
+        "max_move_seconds": slowest,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--black", choices=DIFFICULTIES, default="medium")
+    parser.add_argument("--white", choices=DIFFICULTIES, default="medium")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--board-size", type=int, default=9)
+    parser.add_argument("--max-moves", type=int, help="default 2 x points")
+    parser.add_argument("--komi", type=float, default=DEFAULT_KOMI)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--swap", action="store_true", help="alternate colors")
+    parser.add_argument("--move-time", type=float, help="seconds per move")
+    parser.add_argument("--playouts", type=int, help="MCTS playouts per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="JSONL file; stdout by default")
+    args = parser.parse_args()
+
+    max_moves = args.max_moves or 2 * args.board_size * args.board_size
+    wins: Dict[str, int] = {}
+    total_seconds = 0.0
+    start = time.perf_counter()
+    # Spawned rather than forked, like parallel_search
+    with ExitStack() as stack:
+        results = sys.stdout
+        if args.output:
+            results = stack.enter_context(open(args.output, "w"))
+        executor = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=args.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        )
+        futures = []
+        for number in range(args.games):
+            black, white = args.black, args.white
+            if args.swap and number % 2:
+                black, white = white, black
+            futures.append(
+                executor.submit(
+                    play_game,
+                    number,
+                    black,
+                    white,
+                    args.board_size,
+                    args.seed + number,
+                    max_moves,
+                    args.komi,
+                    args.move_time,
+                    args.playouts,
+                )
+            )
+        for future in as_completed(futures):
+            result = future.result()
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+            if result["winner"] == "draw":
+                label = "draw"
+            else:
+                label = f"{result[result['winner']]} as {result['winner']}"
+            wins[label] = wins.get(label, 0) + 1
+            total_seconds += result["seconds"]
+    wall = time.perf_counter() - start
+
+    print(f"{args.games} games on {args.board_size}x{args.board_size}", file=sys.stderr)
+    for label, count in sorted(wins.items()):
+        print(f"  {label:<24} {count}", file=sys.stderr)
+    print(
+        f"{args.games / wall * 3600:.1f} games/hour wall clock, "
+        f"{args.games / max(total_seconds, 1e-9) * 3600:.1f} games/hour per worker",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
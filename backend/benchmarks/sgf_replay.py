@@ -0,0 +1,97 @@
+"""SGF collection replay throughput in games per second.
+
+Writes a collection of random legal games (fixed seed) to a temporary file,
+or uses --file, then streams it through sgf.read_games. Parsing alone and
+parsing plus rule-checked replay are timed separately. With --memory a
+third pass reports peak Python memory, which does not grow with the size of
+the collection (tracing slows that pass down, so it is not timed).
+
+Usage (from backend/):
+    python -m benchmarks.sgf_replay --games 2000 --board-size 19
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from go_game import GoGame
+from sgf import read_games, replay
+
+
+def random_game(board_size: int, moves: int, rng: random.Random) -> GoGame:
+    """Random legal moves, passing when several tries find nothing"""
+    game = GoGame(board_size)
+    while len(game.move_history) < moves and not game.game_ended:
+        for _ in range(20):
+            if game.play(rng.randrange(board_size), rng.randrange(board_size)):
+                break
+        else:
+            game._pass()
+    return game
+
+
+def write_collection(path: str, games: int, board_size: int, moves: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w") as sgf_file:
+        for _ in range(games):
+            sgf_file.write(random_game(board_size, moves, rng).to_sgf())
+            sgf_file.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", help="SGF collection to replay instead")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--board-size", type=int, default=19)
+    parser.add_argument("--moves", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".sgf")
+        os.close(handle)
+        write_collection(path, args.games, args.board_size, args.moves, args.seed)
+    try:
+        size_mb = os.path.getsize(path) / 1e6
+
+        start = time.perf_counter()
+        with open(path) as sgf_file:
+            games = sum(1 for _ in read_games(sgf_file))
+        parse_seconds = time.perf_counter() - start
+
+        moves = 0
+        start = time.perf_counter()
+        with open(path) as sgf_file:
+            for record in read_games(sgf_file):
+                moves += len(replay(record).move_history)
+        replay_seconds = time.perf_counter() - start
+
+        peak_mb = None
+        if args.memory:
+            tracemalloc.start()
+            with open(path) as sgf_file:
+                for record in read_games(sgf_file):
+                    replay(record)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+    finally:
+        if args.file is None:
+            os.remove(path)
+
+    print(f"{games} games, {moves} moves, {size_mb:.1f} MB")
+    print(f"parse only:      {games / parse_seconds:10.1f} games/s")
+    print(
+        f"parse + replay:  {games / replay_seconds:10.1f} games/s "
+        f"({moves / replay_seconds:.0f} moves/s)"
+    )
+    if peak_mb is not None:
+        print(f"peak memory:     {peak_mb:10.1f} MB traced")
+
+
+if __name__ == "__main__":
+    main()
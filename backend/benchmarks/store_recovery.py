@@ -0,0 +1,81 @@
+"""Move-log append latency and startup recovery time of persistence.LogStore.
+
+Plays random games into a LogStore in a temporary directory, reopens it and
+restores every game into a GameRegistry the way main.py does at startup.
+Reported: the cost of record_move on the request path, recovery time, and
+the one-off replay cost when a restored game is first used.
+
+Usage (from backend/):
+    python -m benchmarks.store_recovery --games 5000 --moves 150
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from go_game import GoGame
+from persistence import LogStore
+from sessions import GameRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--moves", type=int, default=150)
+    parser.add_argument("--board-size", type=int, default=19)
+    parser.add_argument("--snapshot-every", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = LogStore(directory, snapshot_every=args.snapshot_every)
+        games = {}
+        for number in range(args.games):
+            game_id = f"game-{number}"
+            games[game_id] = GoGame(args.board_size)
+            store.record_new(game_id, args.board_size)
+
+        # Interleave the games' moves, like concurrent players
+        append_seconds = 0.0
+        appended = 0
+        for _ in range(args.moves):
+            for game_id, game in games.items():
+                while not game.play(
+                    rng.randrange(args.board_size), rng.randrange(args.board_size)
+                ):
+                    pass
+                start = time.perf_counter()
+                store.record_move(game_id, game)
+                append_seconds += time.perf_counter() - start
+                appended += 1
+        store.close()
+        snapshots = store.snapshots
+
+        start = time.perf_counter()
+        store = LogStore(directory)
+        registry = GameRegistry(max_games=args.games + 1)
+        for game_id, board_size, history in store.load():
+            registry.restore(game_id, board_size, history)
+        recover_seconds = time.perf_counter() - start
+        store.close()
+
+        start = time.perf_counter()
+        restored = registry.get("game-0")
+        first_use_seconds = time.perf_counter() - start
+        assert restored.board == games["game-0"].board
+
+    print(
+        f"{args.games} games x {args.moves} moves on {args.board_size}x"
+        f"{args.board_size}, {snapshots} snapshots while writing"
+    )
+    print(f"record_move:      {append_seconds / appended * 1e6:8.2f} us per move")
+    print(
+        f"recovery:         {recover_seconds * 1000:8.1f} ms for {len(registry)} games"
+    )
+    print(f"first use replay: {first_use_seconds * 1000:8.1f} ms per game")
+
+
+if __name__ == "__main__":
+    main()
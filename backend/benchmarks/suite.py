@@ -0,0 +1,230 @@
+"""Benchmark suite for the rules engine and AI hot paths.
+
+Every case runs on 9x9, 13x13 and 19x19 positions from the opening, middle
+game and late game, built by random legal play from a fixed seed, so two
+runs on the same commit time the same work. Each case reports the best
+per-call time over several repeats. Results are written as JSON; given a
+baseline file, cases that got slower than the threshold are listed and the
+exit status is 1, so a run can guard engine changes.
+
+Usage (from backend/):
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --compare bench.json --threshold 0.15
+    python -m benchmarks.suite --sizes 9 --only "get_move"
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from ai_opponent import OPENING_MOVES, GoAI
+from go_game import GoGame, Player
+from transposition import TranspositionTable
+
+# Share of the board covered by moves played for each phase
+PHASES = {"opening": 0.1, "middle": 0.35, "late": 0.6}
+DIFFICULTIES = ["easy", "medium", "hard", "expert"]
+
+
+def build_position(board_size: int, phase: str, seed: int) -> GoGame:
+    """Random legal play from an empty board; the same for a given seed.
+
+    At least OPENING_MOVES are played, so GoAI searches in every phase
+    instead of taking an opening point.
+    """
+    rng = random.Random(f"{board_size}-{phase}-{seed}")
+    game = GoGame(board_size)
+    moves = max(int(board_size * board_size * PHASES[phase]), OPENING_MOVES)
+    while len(game.move_history) < moves:
+        game.play(rng.randrange(board_size), rng.randrange(board_size))
+    return game
+
+
+def best_time(function: Callable[[], int], repeats: int, min_seconds: float) -> float:
+    """Best seconds per operation; `function` runs a batch and returns its size"""
+    best = float("inf")
+    for _ in range(repeats):
+        operations = 0
+        start = time.perf_counter()
+        while True:
+            operations += function()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        best = min(best, elapsed / operations)
+    return best
+
+
+def engine_cases(game: GoGame) -> Dict[str, Callable[[], int]]:
+    """Rules engine cases for one position, each returning its batch size"""
+    size = game.board_size
+    player = game.current_player
+    opponent = Player.WHITE if player == Player.BLACK else Player.BLACK
+    points = [(row, col) for row in range(size) for col in range(size)]
+    empty = [
+        point for point in points if game.board[point[0]][point[1]] == Player.EMPTY
+    ]
+    stones = [
+        point for point in points if game.board[point[0]][point[1]] != Player.EMPTY
+    ]
+    legal = [point for point in empty if not game.is_suicide_move(*point, player)]
+    ai = GoAI("medium", player)
+
+    def make_move():
+        for row, col in legal:
+            if game.make_move(row, col):
+                game.undo()
+        return len(legal)
+
+    def is_suicide_move():
+        for row, col in empty:
+            game.is_suicide_move(row, col, player)
+        return len(empty)
+
+    def capture_stones():
+        game.capture_stones(opponent)
+        return 1
+
+    def group_and_liberties():
+        for row, col in stones:
+            game.get_liberties(game.get_group(row, col))
+        return max(len(stones), 1)
+
+    def get_board_state():
+        game.get_board_state()
+        return 1
+
+    def valid_moves():
+        ai._get_valid_moves(game)
+        return 1
+
+    def score_moves():
+        ai._score_moves(game, legal)
+        return max(len(legal), 1)
+
+    return {
+        "make_move": make_move,
+        "is_suicide_move": is_suicide_move,
+        "capture_stones": capture_stones,
+        "get_group+get_liberties": group_and_liberties,
+        "get_board_state": get_board_state,
+        "_get_valid_moves": valid_moves,
+        "_score_moves": score_moves,
+    }
+
+
+def time_get_move(
+    game: GoGame, difficulty: str, repeats: int, playouts: int, seed: int
+) -> float:
+    """Best seconds per get_move, with a fresh transposition table each time"""
+    best = float("inf")
+    for _ in range(repeats):
+        random.seed(seed)
+        ai = GoAI(difficulty, game.current_player, table=TranspositionTable())
+        if ai.config.get("engine") == "mcts":
+            # A fixed playout budget instead of a time limit keeps runs comparable
+            ai.config = dict(ai.config, max_playouts=playouts, time_limit=1e9)
+        start = time.perf_counter()
+        ai.get_move(game)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(args) -> Dict[str, float]:
+    only = re.compile(args.only) if args.only else None
+    results = {}
+    for size in args.sizes:
+        for phase in args.phases:
+            game = build_position(size, phase, args.seed)
+
+            cases: List[Tuple[str, Callable[[], float]]] = [
+                (
+                    name,
+                    lambda case=case: best_time(case, args.repeats, args.min_time),
+                )
+                for name, case in engine_cases(game).items()
+            ]
+            cases += [
+                (
+                    f"get_move[{difficulty}]",
+                    lambda game=game, difficulty=difficulty: time_get_move(
+                        game, difficulty, args.ai_repeats, args.playouts, args.seed
+                    ),
+                )
+                for difficulty in args.difficulties
+            ]
+            for name, measure in cases:
+                key = f"{name}/{size}x{size}/{phase}"
+                if only is not None and not only.search(key):
+                    continue
+                results[key] = measure()
+                print(f"{key:<48} {results[key] * 1e6:14.2f} us", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, float], baseline_path: str, threshold: float) -> bool:
+    """Print ratios against a baseline; True when nothing regressed"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = []
+    for key, seconds in results.items():
+        if key not in baseline:
+            continue
+        ratio = seconds / baseline[key]
+        marker = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            marker = "  REGRESSION"
+        print(f"{key:<48} {ratio:8.2f}x{marker}")
+    if regressions:
+        print(f"{len(regressions)} cases slower than {1 + threshold:.2f}x baseline")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[9, 13, 19])
+    parser.add_argument(
+        "--phases", nargs="+", choices=list(PHASES), default=list(PHASES)
+    )
+    parser.add_argument(
+        "--difficulties", nargs="+", choices=DIFFICULTIES, default=DIFFICULTIES
+    )
+    parser.add_argument("--only", help="regex; run only the matching cases")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--ai-repeats", type=int, default=3)
+    parser.add_argument("--playouts", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "unit": "seconds per call",
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Optional int8 NumPy mirror of a GoGame board.
+
+GoGame keeps its list-of-lists board for compatibility; when created with
+backend="numpy" it also mirrors every point into an ArrayBoard so that
+whole-board questions (influence, serialization) run as
+array operations instead of Python loops.
+"""
+
+from functools import lru_cache
+from typing import List
+
+from geometry import INFLUENCE_RADIUS
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+@lru_cache(maxsize=None)
+def influence_kernel(radius: int = INFLUENCE_RADIUS):
+    """Weights 1 / (distance + 1) for points within a Manhattan radius.
+
+    Built once per radius and shared, so the array is read-only.
+    """
+    size = 2 * radius + 1
+    kernel = np.zeros((size, size), dtype=np.float64)
+    for dr in range(-radius, radius + 1):
+        for dc in range(-radius, radius + 1):
+            distance = abs(dr) + abs(dc)
+            if distance <= radius:
+                kernel[dr + radius, dc + radius] = 1.0 / (distance + 1)
+    kernel.setflags(write=False)
+    return kernel
+
+
+class ArrayBoard:
+    """Board cells as a contiguous (size, size) int8 array of Player values"""
+
+    def __init__(self, board_size: int):
+        if np is None:
+            raise RuntimeError("The numpy board backend requires numpy")
+        self.board_size = board_size
+        self.cells = np.zeros((board_size, board_size), dtype=np.int8)
+        self._kernel = influence_kernel()
+
+    def load(self, board) -> None:
+        """Copy a list-of-lists Player board into the array"""
+        self.cells[:, :] = [[cell.value for cell in row] for row in board]
+
+    def copy(self) -> "ArrayBoard":
+        other = ArrayBoard.__new__(ArrayBoard)
+        other.board_size = self.board_size
+        other.cells = self.cells.copy()
+        other._kernel = self._kernel
+        return other
+
+    def set(self, row: int, col: int, value: int) -> None:
+        self.cells[row, col] = value
+
+    def influence_at(self, row: int, col: int) -> float:
+        """Kernel-weighted number of empty points around (row, col)"""
+        radius = INFLUENCE_RADIUS
+        low_row, low_col = row - radius, col - radius
+        window_rows = slice(max(low_row, 0), min(row + radius + 1, self.board_size))
+        window_cols = slice(max(low_col, 0), min(col + radius + 1, self.board_size))
+        window = self.cells[window_rows, window_cols] == 0
+        kernel = self._kernel[
+            window_rows.start - low_row : window_rows.stop - low_row,
+            window_cols.start - low_col : window_cols.stop - low_col,
+        ]
+        return float((kernel * window).sum())
+
+    def to_list(self) -> List[List[int]]:
+        return self.cells.tolist()
@@ -0,0 +1,106 @@
+"""Compact binary encodings of board positions.
+
+Boards are packed at 2 bits per point (0 empty, 1 black, 2 white), four
+points per byte in row-major order, so a 19x19 board fits in 91 bytes.
+Move histories take 2 bytes per move or pass.
+
+Game states for the API (see GoGame.serialized_state) are JSON by default,
+or msgpack / a fixed binary layout with the board packed as above.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+
+# Binary state: board size, player to move, black and white captures,
+# game ended, consecutive passes (capped at 255), ko row and column (-1 for
+# none), then the packed board
+STATE_HEADER = struct.Struct("<BBHHBBbb")
+
+STATE_MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "binary": "application/octet-stream",
+}
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def pack_board(cells: Sequence[int]) -> bytes:
+    """Pack a flat row-major sequence of point values (0-2) into bytes"""
+    packed = bytearray((len(cells) + 3) // 4)
+    for index, value in enumerate(cells):
+        packed[index >> 2] |= value << ((index & 3) << 1)
+    return bytes(packed)
+
+
+def unpack_board(data: bytes, count: int) -> List[int]:
+    """Inverse of pack_board for a board of `count` points"""
+    return [(data[index >> 2] >> ((index & 3) << 1)) & 3 for index in range(count)]
+
+
+_PASS_ENTRY = 0xFFFF
+
+Move = Optional[Tuple[int, int, int]]  # (row, col, color value), None for a pass
+
+
+def pack_moves(moves: Sequence[Move], size: int) -> bytes:
+    """Pack a move list at 2 bytes per entry: point index and a white bit"""
+    entries = [
+        _PASS_ENTRY if move is None else (move[0] * size + move[1]) << 1 | move[2] >> 1
+        for move in moves
+    ]
+    return struct.pack(f"<{len(entries)}H", *entries)
+
+
+def unpack_moves(data: bytes, size: int) -> List[Move]:
+    """Inverse of pack_moves"""
+    moves: List[Move] = []
+    for (entry,) in struct.iter_unpack("<H", data):
+        if entry == _PASS_ENTRY:
+            moves.append(None)
+        else:
+            row, col = divmod(entry >> 1, size)
+            moves.append((row, col, 2 if entry & 1 else 1))
+    return moves
+
+
+def encode_state(
+    state: Dict,
+    cells: Sequence[int],
+    ko: Optional[Tuple[int, int]],
+    state_format: str,
+) -> bytes:
+    """Encode a get_board_state() dict in one of STATE_MEDIA_TYPES.
+
+    `cells` is the flat row-major board, which msgpack and binary send
+    packed; the binary layout also carries the ko point.
+    """
+    if state_format == "json":
+        return json.dumps(state, separators=(",", ":")).encode()
+    if state_format == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.packb({**state, "board": pack_board(cells)})
+    if state_format == "binary":
+        ko_row, ko_col = ko or (-1, -1)
+        header = STATE_HEADER.pack(
+            state["board_size"],
+            state["current_player"],
+            state["captured_stones"]["black"],
+            state["captured_stones"]["white"],
+            state["game_ended"],
+            # Passes can go on after the game ends; only 0, 1 and 2+ matter
+            min(state["consecutive_passes"], 255),
+            ko_row,
+            ko_col,
+        )
+        return header + pack_board(cells)
+    raise ValueError(f"Unknown state format: {state_format}")
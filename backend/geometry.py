@@ -0,0 +1,157 @@
+"""Board geometry that only depends on the board size, built once per size.
+
+Neighbor lists, the territory influence kernel clipped to the board, the
+first/second line penalties, the 3x3 pattern slots, the board symmetries
+and opening points are the same for every game of a size.
+geometry() builds them on first use and hands the same read-only tables to
+every GoGame and GoAI.
+"""
+
+from functools import lru_cache
+from typing import FrozenSet, List, Tuple
+
+Point = Tuple[int, int]
+
+# Territory influence reaches this Manhattan distance, weighted 1 / (d + 1)
+INFLUENCE_RADIUS = 3
+
+# The 8 points around a point, in the order of the 2-bit slots of its 3x3
+# pattern code (slot i is bits 2i and 2i + 1)
+PATTERN_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+# Slot value of an off-board point; empty, black and white are Player values
+OFF_BOARD = 3
+
+
+class BoardGeometry:
+    """Precomputed per-point tables for one board size"""
+
+    def __init__(self, board_size: int):
+        self.board_size = board_size
+        points = range(board_size)
+
+        # On-board orthogonal neighbors of each point
+        self.neighbors: List[List[Tuple[Point, ...]]] = [
+            [
+                tuple(
+                    (row + dr, col + dc)
+                    for dr, dc in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                    if 0 <= row + dr < board_size and 0 <= col + dc < board_size
+                )
+                for col in points
+            ]
+            for row in points
+        ]
+
+        # Points within INFLUENCE_RADIUS of each point, with their weights
+        radius = INFLUENCE_RADIUS
+        self.influence: List[List[Tuple[Tuple[int, int, float], ...]]] = [
+            [
+                tuple(
+                    (row + dr, col + dc, 1.0 / (abs(dr) + abs(dc) + 1))
+                    for dr in range(-radius, radius + 1)
+                    for dc in range(-radius, radius + 1)
+                    if abs(dr) + abs(dc) <= radius
+                    and 0 <= row + dr < board_size
+                    and 0 <= col + dc < board_size
+                )
+                for col in points
+            ]
+            for row in points
+        ]
+
+        # -2 for a point on the first line of either axis, -1 for the second
+        # line of either axis; a point can collect both
+        edges = {0, board_size - 1}
+        seconds = {1, board_size - 2}
+        self.line_penalty: List[List[int]] = [
+            [
+                -2 * (row in edges or col in edges) - (row in seconds or col in seconds)
+                for col in points
+            ]
+            for row in points
+        ]
+
+        # On-board points around each point, with the bit shift of that
+        # point's slot in their pattern codes: a stone placed here updates them
+        self.pattern_slots: List[List[Tuple[Tuple[int, int, int], ...]]] = [
+            [
+                tuple(
+                    (row - dr, col - dc, 2 * slot)
+                    for slot, (dr, dc) in enumerate(PATTERN_OFFSETS)
+                    if 0 <= row - dr < board_size and 0 <= col - dc < board_size
+                )
+                for col in points
+            ]
+            for row in points
+        ]
+
+        # Pattern code of each point on an empty board: only the edge is set
+        self.empty_patterns: List[List[int]] = [
+            [
+                sum(
+                    OFF_BOARD << 2 * slot
+                    for slot, (dr, dc) in enumerate(PATTERN_OFFSETS)
+                    if not (0 <= row + dr < board_size and 0 <= col + dc < board_size)
+                )
+                for col in points
+            ]
+            for row in points
+        ]
+
+        # The 8 rotations and reflections of the board: symmetries[s][row][col]
+        # is where symmetry s takes the point, and inverse_symmetries[s] is the
+        # symmetry that takes it back
+        last = board_size - 1
+        transforms = (
+            lambda row, col: (row, col),
+            lambda row, col: (col, last - row),
+            lambda row, col: (last - row, last - col),
+            lambda row, col: (last - col, row),
+            lambda row, col: (row, last - col),
+            lambda row, col: (last - row, col),
+            lambda row, col: (col, row),
+            lambda row, col: (last - col, last - row),
+        )
+        self.symmetries: Tuple[Tuple[Tuple[Point, ...], ...], ...] = tuple(
+            tuple(tuple(transform(row, col) for col in points) for row in points)
+            for transform in transforms
+        )
+        self.inverse_symmetries: Tuple[int, ...] = tuple(
+            next(
+                back
+                for back, undo in enumerate(self.symmetries)
+                if all(
+                    undo[mapping[row][col][0]][mapping[row][col][1]] == (row, col)
+                    for row in points
+                    for col in points
+                )
+            )
+            for mapping in self.symmetries
+        )
+
+        far = board_size - 4
+        near = board_size - 3
+        # 3-4 and 4-4 points of each corner, for opening play
+        self.corner_moves: FrozenSet[Point] = frozenset(
+            {
+                (3, 3),
+                (3, far),
+                (far, 3),
+                (far, far),
+                (2, 3),
+                (3, 2),
+                (2, far),
+                (3, near),
+                (near, 3),
+                (far, 2),
+                (near, far),
+                (far, near),
+            }
+        )
+
+
+@lru_cache(maxsize=None)
+def geometry(board_size: int) -> BoardGeometry:
+    """The shared geometry tables of a board size"""
+    return BoardGeometry(board_size)
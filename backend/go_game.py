@@ -1,6 +1,21 @@
-from typing import List, Set, Tuple
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
 from enum import Enum
-import copy
+from functools import lru_cache
+import random
+import struct
+
+from board_array import ArrayBoard
+from encoding import (
+    encode_state,
+    pack_board,
+    pack_moves,
+    unpack_board,
+    unpack_moves,
+)
+from geometry import geometry
+
+if TYPE_CHECKING:
+    from scoring import Estimate, Score
 
 
 class Player(Enum):
@@ -9,9 +24,72 @@ class Player(Enum):
     WHITE = 2
 
 
+# to_compact header: size, player to move, ko row/col (-1 for none), black
+# and white captures, consecutive passes (capped at 255), game ended, number
+# of positions
+_COMPACT_HEADER = struct.Struct("<BBbbHHBBI")
+
+# Zobrist key XORed into a position key when white is to move
+WHITE_TO_MOVE_KEY = random.Random("white-to-move").getrandbits(64)
+
+# Process-wide work counters, read by the metrics endpoint
+engine_counters: Dict[str, int] = {"copies": 0, "flood_fills": 0}
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(board_size: int) -> Dict[Player, List[List[int]]]:
+    """Random 64-bit key per (color, point), shared by all games of a size.
+
+    The generator is seeded with the board size so keys, and therefore
+    position hashes, are identical across processes and restarts.
+    """
+    rng = random.Random(board_size)
+    return {
+        color: [
+            [rng.getrandbits(64) for _ in range(board_size)] for _ in range(board_size)
+        ]
+        for color in (Player.BLACK, Player.WHITE)
+    }
+
+
+class _Chain:
+    """A connected group of same-colored stones together with its liberties"""
+
+    __slots__ = ("color", "stones", "liberties")
+
+    def __init__(
+        self,
+        color: Player,
+        stones: Set[Tuple[int, int]],
+        liberties: Set[Tuple[int, int]],
+    ):
+        self.color = color
+        self.stones = stones
+        self.liberties = liberties
+
+
+class UndoRecord(NamedTuple):
+    """Everything needed to take back one move or pass"""
+
+    move: Optional[Tuple[int, int]]  # None for a pass
+    player: Player
+    captured: Tuple[Tuple[int, int], ...]
+    previous_player: Player
+    previous_ko_position: Optional[Tuple[int, int]]
+    previous_consecutive_passes: int
+    previous_game_ended: bool
+
+
 class GoGame:
-    def __init__(self, board_size: int = 19):
+    def __init__(self, board_size: int = 19, backend: str = "list"):
+        if backend not in ("list", "numpy"):
+            raise ValueError(f"Unknown board backend: {backend}")
         self.board_size = board_size
+        self._neighbors = geometry(board_size).neighbors
+        self._pattern_slots = geometry(board_size).pattern_slots
+        # Optional int8 mirror of the board for array-based evaluation
+        self.array = ArrayBoard(board_size) if backend == "numpy" else None
+        self._zobrist = zobrist_keys(board_size)
         self.board = [
             [Player.EMPTY for _ in range(board_size)] for _ in range(board_size)
         ]
@@ -21,44 +99,193 @@ class GoGame:
         self.ko_position = None
         self.consecutive_passes = 0
         self.game_ended = False
-
-    def get_neighbors(self, row: int, col: int) -> List[Tuple[int, int]]:
-        """Get valid neighboring positions"""
-        neighbors = []
-        for dr, dc in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            new_row, new_col = row + dr, col + dc
-            if 0 <= new_row < self.board_size and 0 <= new_col < self.board_size:
-                neighbors.append((new_row, new_col))
-        return neighbors
-
-    def get_group(self, row: int, col: int) -> Set[Tuple[int, int]]:
-        """Get all stones in the same group (connected stones of same color)"""
-        if self.board[row][col] == Player.EMPTY:
-            return set()
-
-        group = set()
-        color = self.board[row][col]
+        self._undo_stack: List[UndoRecord] = []
+
+    @property
+    def board(self) -> List[List[Player]]:
+        return self._board
+
+    @board.setter
+    def board(self, board: List[List[Player]]):
+        # Assigning a whole board invalidates the chain bookkeeping, so it is
+        # rebuilt from scratch. Normal play keeps it up to date incrementally.
+        self._board = board
+        if self.array is not None:
+            self.array.load(board)
+        self._rebuild_chains()
+        self._rebuild_patterns()
+        # Encoded states by format, dropped whenever the game changes
+        self._serialized: Dict[Tuple[str, bool], bytes] = {}
+        # scoring.estimate() of the position, dropped likewise
+        self._estimate: Optional["Estimate"] = None
+
+        # Zobrist hash of the stones on the board, kept up to date by
+        # _set_point, and how often each position has occurred (superko)
+        self.position_hash = 0
+        for row in range(self.board_size):
+            for col in range(self.board_size):
+                if board[row][col] != Player.EMPTY:
+                    self.position_hash ^= self._zobrist[board[row][col]][row][col]
+        self._position_counts: Dict[int, int] = {self.position_hash: 1}
+
+    def _rebuild_chains(self):
+        """Recompute every chain and its liberties from the board"""
+        self._chain_at: List[List[Optional[_Chain]]] = [
+            [None for _ in range(self.board_size)] for _ in range(self.board_size)
+        ]
+        self._chains: Set[_Chain] = set()
+        for row in range(self.board_size):
+            for col in range(self.board_size):
+                if (
+                    self._board[row][col] != Player.EMPTY
+                    and self._chain_at[row][col] is None
+                ):
+                    self._build_chain(row, col)
+
+    def _rebuild_patterns(self):
+        """Recompute the 3x3 pattern code of every point from the board"""
+        self._patterns = [list(row) for row in geometry(self.board_size).empty_patterns]
+        for row in range(self.board_size):
+            for col in range(self.board_size):
+                value = self._board[row][col].value
+                if value:
+                    for point_row, point_col, shift in self._pattern_slots[row][col]:
+                        self._patterns[point_row][point_col] |= value << shift
+
+    def _build_chain(self, row: int, col: int) -> _Chain:
+        """Flood-fill the chain at (row, col) and register it"""
+        engine_counters["flood_fills"] += 1
+        color = self._board[row][col]
+        stones = {(row, col)}
+        liberties = set()
         stack = [(row, col)]
 
         while stack:
             current_row, current_col = stack.pop()
-            if (current_row, current_col) in group:
-                continue
-
-            group.add((current_row, current_col))
-
             for neighbor_row, neighbor_col in self.get_neighbors(
                 current_row, current_col
             ):
-                if (neighbor_row, neighbor_col) not in group and self.board[
-                    neighbor_row
-                ][neighbor_col] == color:
+                neighbor = self._board[neighbor_row][neighbor_col]
+                if neighbor == Player.EMPTY:
+                    liberties.add((neighbor_row, neighbor_col))
+                elif neighbor == color and (neighbor_row, neighbor_col) not in stones:
+                    stones.add((neighbor_row, neighbor_col))
                     stack.append((neighbor_row, neighbor_col))
 
-        return group
+        chain = _Chain(color, stones, liberties)
+        self._chains.add(chain)
+        for stone_row, stone_col in stones:
+            self._chain_at[stone_row][stone_col] = chain
+        return chain
+
+    def _set_point(self, row: int, col: int, player: Player):
+        """Write a single board point (every board mutation goes through here)"""
+        previous = self._board[row][col]
+        if previous != Player.EMPTY:
+            self.position_hash ^= self._zobrist[previous][row][col]
+        if player != Player.EMPTY:
+            self.position_hash ^= self._zobrist[player][row][col]
+        self._board[row][col] = player
+        if self.array is not None:
+            self.array.set(row, col, player.value)
+        # Only the 8 points around this one see it in their pattern codes
+        value = player.value
+        patterns = self._patterns
+        for point_row, point_col, shift in self._pattern_slots[row][col]:
+            codes = patterns[point_row]
+            codes[point_col] = codes[point_col] & ~(3 << shift) | value << shift
+
+    def _merge_chains(self, first: _Chain, second: _Chain) -> _Chain:
+        """Merge two chains of the same color, relabelling the smaller one"""
+        if len(first.stones) < len(second.stones):
+            first, second = second, first
+        first.stones |= second.stones
+        first.liberties |= second.liberties
+        for row, col in second.stones:
+            self._chain_at[row][col] = first
+        self._chains.discard(second)
+        return first
+
+    def _remove_chain(self, chain: _Chain):
+        """Take a chain off the board and hand its points back as liberties"""
+        self._chains.discard(chain)
+        for row, col in chain.stones:
+            self._set_point(row, col, Player.EMPTY)
+            self._chain_at[row][col] = None
+        for row, col in chain.stones:
+            for neighbor_row, neighbor_col in self.get_neighbors(row, col):
+                neighbor = self._chain_at[neighbor_row][neighbor_col]
+                if neighbor is not None:
+                    neighbor.liberties.add((row, col))
+
+    def _place_stone(self, row: int, col: int, player: Player) -> List[Tuple[int, int]]:
+        """Place a stone, update the chains around it and remove captured ones.
+
+        Only the placed stone, its neighboring chains and any captured chains
+        are touched. Returns the captured points.
+        """
+        self._set_point(row, col, player)
+        chain = _Chain(player, {(row, col)}, set())
+        self._chains.add(chain)
+        self._chain_at[row][col] = chain
+
+        dead_chains = []
+        for neighbor_row, neighbor_col in self.get_neighbors(row, col):
+            neighbor = self._chain_at[neighbor_row][neighbor_col]
+            if neighbor is None:
+                chain.liberties.add((neighbor_row, neighbor_col))
+            elif neighbor.color == player:
+                if neighbor is not chain:
+                    chain = self._merge_chains(chain, neighbor)
+            else:
+                neighbor.liberties.discard((row, col))
+                if not neighbor.liberties and neighbor not in dead_chains:
+                    dead_chains.append(neighbor)
+        chain.liberties.discard((row, col))
+
+        captured = []
+        for dead_chain in dead_chains:
+            captured.extend(dead_chain.stones)
+            self._remove_chain(dead_chain)
+        return captured
+
+    def get_neighbors(self, row: int, col: int) -> Tuple[Tuple[int, int], ...]:
+        """Get valid neighboring positions (a shared tuple, not to be changed)"""
+        return self._neighbors[row][col]
+
+    def chains(
+        self,
+    ) -> List[Tuple[Player, Set[Tuple[int, int]], Set[Tuple[int, int]]]]:
+        """Every chain as (color, stones, liberties); the sets are live, read-only"""
+        return [(chain.color, chain.stones, chain.liberties) for chain in self._chains]
+
+    def liberties_at(self, row: int, col: int) -> Set[Tuple[int, int]]:
+        """Liberties of the chain at (row, col), empty for an empty point.
+
+        The set is live and must not be changed; copy it before playing.
+        """
+        chain = self._chain_at[row][col]
+        return chain.liberties if chain is not None else set()
+
+    def pattern_code(self, row: int, col: int) -> int:
+        """3x3 pattern code of the points around (row, col), see geometry"""
+        return self._patterns[row][col]
+
+    def get_group(self, row: int, col: int) -> Set[Tuple[int, int]]:
+        """Get all stones in the same group (connected stones of same color)"""
+        chain = self._chain_at[row][col]
+        if chain is None:
+            return set()
+        return set(chain.stones)
 
     def get_liberties(self, group: Set[Tuple[int, int]]) -> Set[Tuple[int, int]]:
         """Get all liberties (empty adjacent spaces) for a group"""
+        if group:
+            row, col = next(iter(group))
+            chain = self._chain_at[row][col]
+            if chain is not None and chain.stones == group:
+                return set(chain.liberties)
+
         liberties = set()
         for row, col in group:
             for neighbor_row, neighbor_col in self.get_neighbors(row, col):
@@ -69,128 +296,454 @@ class GoGame:
     def capture_stones(self, opponent: Player) -> int:
         """Capture opponent stones with no liberties and return count"""
         captured_count = 0
-        to_remove = []
-        visited: Set[Tuple[int, int]] = set()
-
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                if self.board[row][col] == opponent and (row, col) not in visited:
-                    group = self.get_group(row, col)
-                    visited.update(group)
-                    liberties = self.get_liberties(group)
-
-                    if not liberties:
-                        to_remove.extend(group)
-                        captured_count += len(group)
-
-        for row, col in to_remove:
-            self.board[row][col] = Player.EMPTY
+        for chain in [
+            chain
+            for chain in self._chains
+            if chain.color == opponent and not chain.liberties
+        ]:
+            captured_count += len(chain.stones)
+            self._remove_chain(chain)
 
         return captured_count
 
     def is_suicide_move(self, row: int, col: int, player: Player) -> bool:
         """Check if move would be suicide (illegal)"""
-        # Make temporary move
-        temp_board = copy.deepcopy(self.board)
-        temp_board[row][col] = player
+        # The stone keeps a liberty if it touches an empty point or joins a
+        # friendly chain with a liberty other than this point. Otherwise it is
+        # only legal if it takes the last liberty of an opponent chain.
+        for neighbor_row, neighbor_col in self.get_neighbors(row, col):
+            neighbor = self._chain_at[neighbor_row][neighbor_col]
+            if neighbor is None:
+                return False
+            if neighbor.color == player:
+                if len(neighbor.liberties) > 1:
+                    return False
+            elif len(neighbor.liberties) == 1:
+                return False  # Move captures opponent, so it's not suicide
 
-        # Check if the placed stone's group has liberties
-        temp_game = GoGame(self.board_size)
-        temp_game.board = temp_board
-        group = temp_game.get_group(row, col)
-        liberties = temp_game.get_liberties(group)
+        return True
 
-        if liberties:
-            return False
+    def count_captures(self, row: int, col: int, player: Player) -> int:
+        """Count the stones `player` would capture by playing at (row, col)"""
+        captured = 0
+        seen = []
+        for neighbor_row, neighbor_col in self.get_neighbors(row, col):
+            neighbor = self._chain_at[neighbor_row][neighbor_col]
+            if (
+                neighbor is not None
+                and neighbor.color != player
+                and len(neighbor.liberties) == 1
+                and neighbor not in seen
+            ):
+                seen.append(neighbor)
+                captured += len(neighbor.stones)
+        return captured
 
-        # Check if move captures opponent stones
-        opponent = Player.WHITE if player == Player.BLACK else Player.BLACK
-        for neighbor_row, neighbor_col in temp_game.get_neighbors(row, col):
-            if temp_board[neighbor_row][neighbor_col] == opponent:
-                opponent_group = temp_game.get_group(neighbor_row, neighbor_col)
-                opponent_liberties = temp_game.get_liberties(opponent_group)
-                if not opponent_liberties:
-                    return False  # Move captures opponent, so it's not suicide
+    def legal_moves(self, player: Optional[Player] = None) -> bytearray:
+        """Get a mask of every legal point for `player` in one pass.
 
-        return True
+        The mask is flat and row-major: point (row, col) is legal when
+        mask[row * board_size + col] is 1.
+        """
+        if player is None:
+            player = self.current_player
 
-    def violates_ko(self, row: int, col: int) -> bool:
-        """Check if move violates ko rule"""
-        if self.ko_position is None:
-            return False
-        return (row, col) == self.ko_position
+        mask = bytearray(self.board_size * self.board_size)
+        index = 0
+        for row in range(self.board_size):
+            board_row = self._board[row]
+            for col in range(self.board_size):
+                if (
+                    board_row[col] == Player.EMPTY
+                    and not self.is_suicide_move(row, col, player)
+                    and self.hash_after_move(row, col, player)
+                    not in self._position_counts
+                ):
+                    mask[index] = 1
+                index += 1
+        return mask
+
+    def zobrist_key(self, player: Optional[Player] = None) -> int:
+        """Hash of the position including the player to move"""
+        if player is None:
+            player = self.current_player
+        if player == Player.WHITE:
+            return self.position_hash ^ WHITE_TO_MOVE_KEY
+        return self.position_hash
+
+    def hash_after_move(self, row: int, col: int, player: Player) -> int:
+        """Position hash after `player` plays at (row, col), without playing it"""
+        position_hash = self.position_hash ^ self._zobrist[player][row][col]
+        seen = []
+        for neighbor_row, neighbor_col in self.get_neighbors(row, col):
+            neighbor = self._chain_at[neighbor_row][neighbor_col]
+            if (
+                neighbor is not None
+                and neighbor.color != player
+                and len(neighbor.liberties) == 1
+                and neighbor not in seen
+            ):
+                seen.append(neighbor)
+                keys = self._zobrist[neighbor.color]
+                for stone_row, stone_col in neighbor.stones:
+                    position_hash ^= keys[stone_row][stone_col]
+        return position_hash
+
+    def violates_ko(self, row: int, col: int, player: Optional[Player] = None) -> bool:
+        """Check if move violates ko rule (positional superko).
+
+        A move may not recreate any board position that already occurred in
+        this game, which covers the simple ko at ko_position.
+        """
+        if player is None:
+            player = self.current_player
+        return self.hash_after_move(row, col, player) in self._position_counts
 
     def make_move(self, row: int, col: int) -> bool:
         """Make a move and return True if successful"""
+        return self.play(row, col)
+
+    def play(self, row: int, col: int, player: Optional[Player] = None) -> bool:
+        """Play a stone in place and push an undo record.
+
+        `player` defaults to the player to move. Returns False, leaving the
+        game untouched, if the move is illegal.
+        """
+        if player is None:
+            player = self.current_player
+
         if not (0 <= row < self.board_size and 0 <= col < self.board_size):
             return False
 
         if self.board[row][col] != Player.EMPTY:
             return False
 
-        if self.is_suicide_move(row, col, self.current_player):
+        if self.is_suicide_move(row, col, player):
             return False
 
-        if self.violates_ko(row, col):
+        if self.violates_ko(row, col, player):
             return False
 
-        # Make the move
-        self.board[row][col] = self.current_player
+        # Make the move and capture opponent stones left without liberties
+        opponent = Player.WHITE if player == Player.BLACK else Player.BLACK
+        captured_points = self._place_stone(row, col, player)
+        self._serialized.clear()
+        self._estimate = None
+        self._undo_stack.append(
+            UndoRecord(
+                move=(row, col),
+                player=player,
+                captured=tuple(captured_points),
+                previous_player=self.current_player,
+                previous_ko_position=self.ko_position,
+                previous_consecutive_passes=self.consecutive_passes,
+                previous_game_ended=self.game_ended,
+            )
+        )
+        captured = len(captured_points)
+        self.captured_stones[player] += captured
 
-        # Capture opponent stones
-        opponent = Player.WHITE if self.current_player == Player.BLACK else Player.BLACK
-        captured = self.capture_stones(opponent)
-        self.captured_stones[self.current_player] += captured
+        self._position_counts[self.position_hash] = (
+            self._position_counts.get(self.position_hash, 0) + 1
+        )
 
-        # Update ko position
+        # Update ko position: a lone stone that captured one stone and has
+        # that point as its only liberty could be retaken immediately
         self.ko_position = None
         if captured == 1:
-            # Check if this was a single stone capture that could create ko
-            for neighbor_row, neighbor_col in self.get_neighbors(row, col):
-                if self.board[neighbor_row][neighbor_col] == Player.EMPTY:
-                    # Check if placing opponent stone here would capture only the stone we just placed
-                    if not self.is_suicide_move(neighbor_row, neighbor_col, opponent):
-                        temp_board = copy.deepcopy(self.board)
-                        temp_board[neighbor_row][neighbor_col] = opponent
-                        temp_game = GoGame(self.board_size)
-                        temp_game.board = temp_board
-                        temp_game.current_player = opponent
-                        would_capture = temp_game.capture_stones(self.current_player)
-                        if would_capture == 1:
-                            self.ko_position = (neighbor_row, neighbor_col)
-                            break
+            chain = self._chain_at[row][col]
+            if len(chain.stones) == 1 and chain.liberties == set(captured_points):
+                self.ko_position = captured_points[0]
 
         # Reset consecutive passes since a move was made
         self.consecutive_passes = 0
 
         # Record move
-        self.move_history.append((row, col, self.current_player))
+        self.move_history.append((row, col, player))
 
         # Switch players
-        self.current_player = (
-            Player.WHITE if self.current_player == Player.BLACK else Player.BLACK
-        )
+        self.current_player = opponent
 
         return True
 
     def pass_turn(self):
         """Pass the current turn"""
+        self._pass()
+        if self.game_ended:
+            score = self.score()
+            winner = score.winner
+            result = (
+                f"{winner.name.lower()} wins by {abs(score.margin)}"
+                if winner is not None
+                else "draw"
+            )
+            print(f"Game ended: Both players passed consecutively, {result}")
+
+    def _pass(self):
+        self._serialized.clear()
+        self._estimate = None
+        self._undo_stack.append(
+            UndoRecord(
+                move=None,
+                player=self.current_player,
+                captured=(),
+                previous_player=self.current_player,
+                previous_ko_position=self.ko_position,
+                previous_consecutive_passes=self.consecutive_passes,
+                previous_game_ended=self.game_ended,
+            )
+        )
         self.move_history.append(None)  # None represents a pass
         self.consecutive_passes += 1
 
         # Check if game should end (both players passed consecutively)
         if self.consecutive_passes >= 2:
             self.game_ended = True
-            print("Game ended: Both players passed consecutively")
 
         self.current_player = (
             Player.WHITE if self.current_player == Player.BLACK else Player.BLACK
         )
 
-    def get_board_state(self):
-        """Get current board state for API response"""
+    def undo(self) -> bool:
+        """Take back the last move or pass. Returns False if there is none."""
+        if not self._undo_stack:
+            return False
+
+        record = self._undo_stack.pop()
+        self.move_history.pop()
+        self._serialized.clear()
+        self._estimate = None
+
+        if record.move is not None:
+            count = self._position_counts[self.position_hash]
+            if count > 1:
+                self._position_counts[self.position_hash] = count - 1
+            else:
+                del self._position_counts[self.position_hash]
+
+            row, col = record.move
+            self._lift_stone(row, col)
+
+            opponent = Player.WHITE if record.player == Player.BLACK else Player.BLACK
+            for captured_row, captured_col in record.captured:
+                self._set_point(captured_row, captured_col, opponent)
+            for captured_row, captured_col in record.captured:
+                if self._chain_at[captured_row][captured_col] is None:
+                    self._build_chain(captured_row, captured_col)
+                for neighbor_row, neighbor_col in self.get_neighbors(
+                    captured_row, captured_col
+                ):
+                    neighbor = self._chain_at[neighbor_row][neighbor_col]
+                    if neighbor is not None and neighbor.color == record.player:
+                        neighbor.liberties.discard((captured_row, captured_col))
+            self.captured_stones[record.player] -= len(record.captured)
+
+        self.current_player = record.previous_player
+        self.ko_position = record.previous_ko_position
+        self.consecutive_passes = record.previous_consecutive_passes
+        self.game_ended = record.previous_game_ended
+        return True
+
+    def _lift_stone(self, row: int, col: int):
+        """Remove a single stone, splitting its chain back into its parts"""
+        chain = self._chain_at[row][col]
+        self._chains.discard(chain)
+        for stone_row, stone_col in chain.stones:
+            self._chain_at[stone_row][stone_col] = None
+        self._set_point(row, col, Player.EMPTY)
+
+        for neighbor_row, neighbor_col in self.get_neighbors(row, col):
+            color = self._board[neighbor_row][neighbor_col]
+            if color == chain.color:
+                if self._chain_at[neighbor_row][neighbor_col] is None:
+                    self._build_chain(neighbor_row, neighbor_col)
+            elif color != Player.EMPTY:
+                self._chain_at[neighbor_row][neighbor_col].liberties.add((row, col))
+
+    def copy(self) -> "GoGame":
+        """Return an independent copy of the game.
+
+        Much cheaper than copy.deepcopy: the board rows, pattern codes and
+        history lists are copied shallowly and the chains are cloned without
+        flood-filling the board again. Cached encodings and the estimate are
+        shared, since neither is ever modified.
+        """
+        engine_counters["copies"] += 1
+        other = GoGame.__new__(GoGame)
+        other.board_size = self.board_size
+        other._neighbors = self._neighbors
+        other._pattern_slots = self._pattern_slots
+        other._zobrist = self._zobrist
+        other.array = self.array.copy() if self.array is not None else None
+        other._board = [list(row) for row in self._board]
+        other._patterns = [list(row) for row in self._patterns]
+        other._chain_at = [[None] * self.board_size for _ in range(self.board_size)]
+        other._chains = set()
+        for chain in self._chains:
+            clone = _Chain(chain.color, set(chain.stones), set(chain.liberties))
+            other._chains.add(clone)
+            for row, col in clone.stones:
+                other._chain_at[row][col] = clone
+        other._serialized = dict(self._serialized)
+        other._estimate = self._estimate
+        other.position_hash = self.position_hash
+        other.current_player = self.current_player
+        other.captured_stones = dict(self.captured_stones)
+        other.move_history = list(self.move_history)
+        other.ko_position = self.ko_position
+        other.consecutive_passes = self.consecutive_passes
+        other.game_ended = self.game_ended
+        other._undo_stack = list(self._undo_stack)
+        other._position_counts = dict(self._position_counts)
+        return other
+
+    def to_compact(self) -> bytes:
+        """Encode the position in a few hundred bytes, e.g. for worker processes.
+
+        The board is packed at 2 bits per point and followed by the hashes of
+        earlier positions so superko still applies. The move history and undo
+        stack are not included.
+        """
+        ko_row, ko_col = self.ko_position or (-1, -1)
+        header = _COMPACT_HEADER.pack(
+            self.board_size,
+            self.current_player.value,
+            ko_row,
+            ko_col,
+            self.captured_stones[Player.BLACK],
+            self.captured_stones[Player.WHITE],
+            # Passes can go on after the game ends; only 0, 1 and 2+ matter
+            min(self.consecutive_passes, 255),
+            self.game_ended,
+            len(self._position_counts),
+        )
+        board = pack_board([cell.value for row in self._board for cell in row])
+        hashes = struct.pack(
+            f"<{len(self._position_counts)}Q", *self._position_counts.keys()
+        )
+        return header + board + hashes
+
+    @classmethod
+    def from_compact(cls, data: bytes, backend: str = "list") -> "GoGame":
+        """Rebuild a game from to_compact() output (with an empty history)"""
+        (
+            board_size,
+            current_player,
+            ko_row,
+            ko_col,
+            black_captures,
+            white_captures,
+            consecutive_passes,
+            game_ended,
+            position_count,
+        ) = _COMPACT_HEADER.unpack_from(data)
+        offset = _COMPACT_HEADER.size
+        board_bytes = (board_size * board_size + 3) // 4
+        cells = unpack_board(data[offset : offset + board_bytes], board_size**2)
+        offset += board_bytes
+
+        game = cls(board_size, backend=backend)
+        game.board = [
+            [Player(cells[row * board_size + col]) for col in range(board_size)]
+            for row in range(board_size)
+        ]
+        game.current_player = Player(current_player)
+        game.ko_position = (ko_row, ko_col) if ko_row >= 0 else None
+        game.captured_stones = {
+            Player.BLACK: black_captures,
+            Player.WHITE: white_captures,
+        }
+        game.consecutive_passes = consecutive_passes
+        game.game_ended = bool(game_ended)
+        hashes = struct.unpack_from(f"<{position_count}Q", data, offset)
+        game._position_counts = {position_hash: 1 for position_hash in hashes}
+        return game
+
+    def history_bytes(self) -> bytes:
+        """The move history packed at 2 bytes per move, see from_history_bytes"""
+        return pack_moves(
+            [
+                None if entry is None else (entry[0], entry[1], entry[2].value)
+                for entry in self.move_history
+            ],
+            self.board_size,
+        )
+
+    @classmethod
+    def from_history_bytes(
+        cls, board_size: int, data: bytes, backend: str = "list"
+    ) -> "GoGame":
+        """Rebuild a game, undo stack included, by replaying its packed history"""
+        game = cls(board_size, backend=backend)
+        for move in unpack_moves(data, board_size):
+            if move is None:
+                game._pass()
+            else:
+                row, col, player = move
+                game.play(row, col, Player(player))
+        return game
+
+    def last_delta(self) -> Dict:
+        """What the last move or pass changed, for clients following the game"""
+        record = self._undo_stack[-1] if self._undo_stack else None
         return {
-            "board": [[cell.value for cell in row] for row in self.board],
+            "move": list(record.move) if record and record.move else None,
+            "player": record.player.value if record else None,
+            "captured": [list(point) for point in record.captured] if record else [],
+            "ko": list(self.ko_position) if self.ko_position else None,
+            "current_player": self.current_player.value,
+            "captured_stones": {
+                "black": self.captured_stones[Player.BLACK],
+                "white": self.captured_stones[Player.WHITE],
+            },
+            "game_ended": self.game_ended,
+            "consecutive_passes": self.consecutive_passes,
+        }
+
+    def to_sgf(self) -> str:
+        """The game as SGF text"""
+        from sgf import to_sgf
+
+        return to_sgf(self)
+
+    @classmethod
+    def from_sgf(cls, text: str, backend: str = "list") -> "GoGame":
+        """Load the first game of SGF text, checking every move"""
+        from sgf import SGFError, read_games, replay
+
+        for record in read_games(text):
+            return replay(record, backend)
+        raise SGFError("No game in SGF text")
+
+    def estimate(self) -> "Estimate":
+        """Dead stones, ownership map and estimated score, cached until a move"""
+        from scoring import estimate
+
+        if self._estimate is None:
+            self._estimate = estimate(self)
+        return self._estimate
+
+    def score(self) -> "Score":
+        """Area score: the final one once the game has ended, else an estimate.
+
+        The final score is Tromp-Taylor after taking off the stones the
+        estimate finds dead; during the game only settled points count.
+        """
+        from scoring import area_score
+
+        if self.game_ended:
+            return area_score(self, dead=self.estimate().dead)
+        return self.estimate().score
+
+    def get_board_state(self, ownership: bool = False):
+        """Get current board state for API response; the ownership map (one
+        float per point) only on request"""
+        if self.array is not None:
+            board = self.array.to_list()
+        else:
+            board = [[cell.value for cell in row] for row in self.board]
+        state = {
+            "board": board,
             "current_player": self.current_player.value,
             "captured_stones": {
                 "black": self.captured_stones[Player.BLACK],
@@ -199,7 +752,29 @@ class GoGame:
             "board_size": self.board_size,
             "game_ended": self.game_ended,
             "consecutive_passes": self.consecutive_passes,
+            "score": self.score().to_dict(),
         }
+        if ownership:
+            state["ownership"] = self.estimate().ownership
+        return state
+
+    def serialized_state(
+        self, state_format: str = "json", ownership: bool = False
+    ) -> bytes:
+        """get_board_state() encoded as "json", "msgpack" or "binary".
+
+        The result is cached until the next move, pass, undo or reset, so
+        repeated reads of an unchanged game cost a dictionary lookup.
+        """
+        key = (state_format, ownership)
+        data = self._serialized.get(key)
+        if data is None:
+            cells = [cell.value for row in self._board for cell in row]
+            data = encode_state(
+                self.get_board_state(ownership), cells, self.ko_position, state_format
+            )
+            self._serialized[key] = data
+        return data
 
     def reset_game(self):
         """Reset the game to initial state"""
@@ -213,3 +788,4 @@ class GoGame:
         self.ko_position = None
         self.consecutive_passes = 0
         self.game_ended = False
+        self._undo_stack = []
@@ -0,0 +1,336 @@
+"""Opt-in timing of AI requests and an on-demand sampling profiler.
+
+With instrumentation on (GO_AI_INSTRUMENT=1, or POST /ai/instrumentation),
+each AI request's GoAI gets timing wrappers around its phase methods:
+valid-move generation, candidate evaluation and each _evaluate_* term. The
+wrappers are instance attributes, so a request that is not measured runs
+the plain methods and pays nothing. Phases nest: evaluate_move includes the
+_evaluate_* terms and search includes everything it evaluates.
+
+Arming the profiler samples the stack of the next AI request's worker
+thread every few milliseconds, for a flame graph or a list of hot functions
+without restarting the server.
+
+Everything is exposed in the Prometheus text format by render_metrics().
+"""
+
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+from go_game import engine_counters
+
+# GoAI methods timed per request, and the phase each is reported as. With
+# numpy, candidates are scored in one batch inside score_moves, so the
+# evaluate_* phases only count the per-move fallback.
+PHASES = {
+    "_get_valid_moves": "valid_moves",
+    "should_pass": "should_pass",
+    "_search": "search",
+    "_score_moves": "score_moves",
+    "_evaluate_move": "evaluate_move",
+    "_evaluate_captures": "evaluate_captures",
+    "_evaluate_liberties": "evaluate_liberties",
+    "_evaluate_territory": "evaluate_territory",
+    "_evaluate_defense": "evaluate_defense",
+    "_evaluate_patterns": "evaluate_patterns",
+}
+
+# Upper bounds of the AI request latency histogram, in seconds
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A metric family: name, type, help text and its samples as
+# (name suffix, labels, value), the suffix being e.g. "_bucket" for histograms
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+class RequestTimings:
+    """Seconds and calls per phase of one AI request"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def wrap(self, phase: str, function: Callable) -> Callable:
+        seconds, calls = self.seconds, self.calls
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds[phase] += clock() - start
+                calls[phase] += 1
+
+        return timed
+
+
+def instrument(ai) -> RequestTimings:
+    """Time `ai`'s phase methods from now on; returns where times go"""
+    timings = RequestTimings()
+    for name, phase in PHASES.items():
+        setattr(ai, name, timings.wrap(phase, getattr(ai, name)))
+    return timings
+
+
+class SamplingProfiler:
+    """Periodically records the Python stack of one thread"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ai-profiler")
+        self._started = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling and summarize the samples"""
+        self._stop.set()
+        self._thread.join()
+        return self.report(time.perf_counter() - self._started)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def report(self, seconds: float, top: int = 25) -> Dict[str, Any]:
+        """Hot functions by own and total samples, and collapsed stacks"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        return {
+            "seconds": seconds,
+            "interval": self.interval,
+            "samples": sum(self.stacks.values()),
+            "top": [
+                {"function": function, "own": count, "total": total[function]}
+                for function, count in own.most_common(top)
+            ],
+            # One "outer;...;inner count" line per stack, for flamegraph.pl
+            "collapsed": "\n".join(
+                f"{';'.join(stack)} {count}"
+                for stack, count in self.stacks.most_common()
+            ),
+        }
+
+
+class AIMetrics:
+    """Totals of measured AI requests, the recent ones, and profile captures"""
+
+    def __init__(self, enabled: bool = False, recent: int = 32):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.seconds = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.phase_seconds: Dict[str, float] = defaultdict(float)
+        self.phase_calls: Dict[str, int] = defaultdict(int)
+        self.nodes = 0
+        self.playouts = 0
+        self.recent: deque = deque(maxlen=recent)
+        self._profile_armed = False
+        self.last_profile: Optional[Dict[str, Any]] = None
+
+    def arm_profile(self):
+        """Profile the next AI request"""
+        with self._lock:
+            self._profile_armed = True
+
+    def _take_profile(self) -> bool:
+        with self._lock:
+            armed, self._profile_armed = self._profile_armed, False
+            return armed
+
+    def profile_status(self) -> str:
+        if self._profile_armed:
+            return "armed"
+        return "captured" if self.last_profile is not None else "idle"
+
+    @contextmanager
+    def measure(self, ai) -> Iterator[None]:
+        """Time the AI request run inside the block, if enabled or profiled"""
+        profile = self._take_profile()
+        if not self.enabled and not profile:
+            yield
+            return
+
+        timings = instrument(ai)
+        before = dict(engine_counters)
+        profiler = SamplingProfiler(threading.get_ident()) if profile else None
+        if profiler is not None:
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                capture = profiler.stop()
+                capture["difficulty"] = ai.difficulty
+                self.last_profile = capture
+            self._record(ai, timings, seconds, before)
+
+    def _record(
+        self, ai, timings: RequestTimings, seconds: float, before: Dict[str, int]
+    ):
+        # Engine counters are process-wide, so with several AI threads the
+        # per-request numbers include the other requests' work
+        counts = {name: engine_counters[name] - before[name] for name in before}
+        playouts = int(ai.search_stats.get("playouts", 0))
+        with self._lock:
+            self.requests += 1
+            self.seconds += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.latency_buckets[index] += 1
+            for phase, phase_seconds in timings.seconds.items():
+                self.phase_seconds[phase] += phase_seconds
+                self.phase_calls[phase] += timings.calls[phase]
+            self.nodes += ai.nodes_searched
+            self.playouts += playouts
+            self.recent.append(
+                {
+                    "difficulty": ai.difficulty,
+                    "seconds": seconds,
+                    "phases": {
+                        phase: {
+                            "seconds": timings.seconds[phase],
+                            "calls": timings.calls[phase],
+                        }
+                        for phase in timings.seconds
+                    },
+                    "nodes_searched": ai.nodes_searched,
+                    "playouts": playouts,
+                    **counts,
+                }
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "requests": self.requests,
+                "profile": self.profile_status(),
+                "recent": list(self.recent),
+            }
+
+    def families(self) -> List[Family]:
+        """The AI and engine metric families"""
+        with self._lock:
+            latency = [
+                ("_bucket", {"le": str(bound)}, count)
+                for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            ]
+            latency += [
+                ("_bucket", {"le": "+Inf"}, self.requests),
+                ("_sum", {}, self.seconds),
+                ("_count", {}, self.requests),
+            ]
+            return [
+                (
+                    "go_ai_instrumentation_enabled",
+                    "gauge",
+                    "1 when AI requests are timed",
+                    [("", {}, int(self.enabled))],
+                ),
+                (
+                    "go_ai_request_seconds",
+                    "histogram",
+                    "Duration of measured AI requests",
+                    latency,
+                ),
+                (
+                    "go_ai_phase_seconds_total",
+                    "counter",
+                    "Time spent in each AI phase; phases nest",
+                    [
+                        ("", {"phase": phase}, seconds)
+                        for phase, seconds in sorted(self.phase_seconds.items())
+                    ],
+                ),
+                (
+                    "go_ai_phase_calls_total",
+                    "counter",
+                    "Calls of each AI phase",
+                    [
+                        ("", {"phase": phase}, calls)
+                        for phase, calls in sorted(self.phase_calls.items())
+                    ],
+                ),
+                (
+                    "go_ai_nodes_searched_total",
+                    "counter",
+                    "Alpha-beta nodes searched by measured requests",
+                    [("", {}, self.nodes)],
+                ),
+                (
+                    "go_ai_playouts_total",
+                    "counter",
+                    "MCTS playouts run by measured requests",
+                    [("", {}, self.playouts)],
+                ),
+                (
+                    "go_engine_copies_total",
+                    "counter",
+                    "GoGame copies",
+                    [("", {}, engine_counters["copies"])],
+                ),
+                (
+                    "go_engine_flood_fills_total",
+                    "counter",
+                    "Chain flood fills",
+                    [("", {}, engine_counters["flood_fills"])],
+                ),
+            ]
+
+
+def stats_families(prefix: str, stats: Dict[str, Any]) -> List[Family]:
+    """Gauges for the numbers in a (nested) stats dict"""
+    families = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            families.extend(stats_families(name, value))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            families.append((name, "gauge", key.replace("_", " "), [("", {}, value)]))
+    return families
+
+
+def render_metrics(families: List[Family]) -> str:
+    """Metric families in the Prometheus text exposition format"""
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            pairs = ",".join(f'{key}="{label}"' for key, label in labels.items())
+            if pairs:
+                pairs = "{" + pairs + "}"
+            lines.append(f"{name}{suffix}{pairs} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,20 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import time
 from go_game import GoGame
-from ai_opponent import GoAI
-
-executor = ThreadPoolExecutor(max_workers=1)
+from ai_opponent import GoAI, forget_game, mcts_stats, transposition_table
+from analysis import (
+    DEFAULT_TOP_K,
+    MAX_TOP_K,
+    AnalysisPool,
+)
+from board_array import numpy_available
+from encoding import STATE_MEDIA_TYPES, msgpack_available
+from instrumentation import (
+    PROMETHEUS_MEDIA_TYPE,
+    AIMetrics,
+    render_metrics,
+    stats_families,
+)
+from parallel_search import ParallelSearch
+from persistence import MAX_GAME_ID_BYTES, open_store
+from pondering import Ponderer
+from scheduler import AIScheduler, QueueFull, SchedulerClosed
+from sessions import GameRegistry
+from streaming import StreamHub
+
+# AI searches run on these threads; past AI_QUEUE_LIMIT waiting jobs,
+# /game/ai_move answers 429 instead of queueing more
+AI_THREADS = int(os.environ.get("GO_AI_THREADS", "1"))
+AI_QUEUE_LIMIT = int(os.environ.get("GO_AI_QUEUE_LIMIT", "16"))
+scheduler = AIScheduler(workers=AI_THREADS, max_queue=AI_QUEUE_LIMIT)
+
+# Rule checks, game changes and the snapshots taken after them run on these
+# threads, so the event loop never does board work itself
+RULES_THREADS = int(os.environ.get("GO_RULES_THREADS", "2"))
+rules_executor = ThreadPoolExecutor(RULES_THREADS, thread_name_prefix="go-rules")
+
+# Seconds the AI may keep searching in the background during each human
+# turn, on otherwise idle AI threads; 0 (the default) turns pondering off
+AI_PONDER_SECONDS = float(os.environ.get("GO_AI_PONDER", "0"))
+ponderer = Ponderer(scheduler, AI_PONDER_SECONDS)
+
+# In-flight /game/ai_move requests by game, shared by duplicate requests
+ai_jobs: Dict[str, asyncio.Task] = {}
+
+# Per-phase timing of AI requests, off unless GO_AI_INSTRUMENT=1; can also
+# be switched on and off at runtime
+ai_metrics = AIMetrics(enabled=os.environ.get("GO_AI_INSTRUMENT") == "1")
+
+# Processes the AI search is split across; 1 keeps it in the server process
+AI_WORKERS = int(os.environ.get("GO_AI_WORKERS", "1"))
+parallel_search = None
+
+# Processes that review games for POST /game/analysis; by default one per
+# core, started on the first review
+ANALYSIS_WORKERS = int(os.environ.get("GO_ANALYSIS_WORKERS", "0"))
+analysis_pool = AnalysisPool(ANALYSIS_WORKERS or None)
+
+# Seconds the API waits for an AI move, and how much of that the search
+# leaves unused so its best move so far arrives before the timeout fires
+AI_MOVE_TIMEOUT = 10.0
+AI_DEADLINE_MARGIN = 0.5
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global parallel_search
+    for game_id, board_size, history in store.load():
+        registry.restore(game_id, board_size, history)
+    if AI_WORKERS > 1:
+        parallel_search = ParallelSearch(AI_WORKERS)
+        parallel_search.warm_up()
     yield
-    executor.shutdown(wait=False)
+    scheduler.shutdown()
+    rules_executor.shutdown()
+    analysis_pool.shutdown()
+    store.close()
+    if parallel_search is not None:
+        parallel_search.shutdown()
 
 
 app = FastAPI(title="Go Game API", version="1.0.0", lifespan=lifespan)
@@ -37,14 +112,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global game instance
-game = GoGame(19)
+# Use the compact NumPy board when numpy is installed
+BOARD_BACKEND = "numpy" if numpy_available() else "list"
+
+# Games on disk when GO_DATA_DIR is set, so they survive restarts
+store = open_store(os.environ.get("GO_DATA_DIR"))
+
+
+def game_evicted(game_id: str):
+    """Drop an evicted game from disk, stop pondering it and drop its
+    search trees"""
+    store.record_delete(game_id)
+    ponderer.forget(game_id)
+    forget_game(game_id)
+
+
+# Games by ID; requests without a game_id share the default game
+DEFAULT_GAME_ID = "default"
+registry = GameRegistry(
+    backend=BOARD_BACKEND, on_evict=game_evicted, on_compact=forget_game
+)
+
+# WebSocket watchers of each game, sent a delta after every move
+hub = StreamHub()
+
+
+def restore_game(board_size: int, history: bytes) -> Tuple[GoGame, GoGame]:
+    """Replay a compacted game and snapshot it"""
+    game = GoGame.from_history_bytes(board_size, history, backend=BOARD_BACKEND)
+    return game, snapshot(game)
+
+
+def fresh_game(board_size: int) -> Tuple[GoGame, GoGame]:
+    """A new game and its snapshot"""
+    game = GoGame(board_size, backend=BOARD_BACKEND)
+    return game, snapshot(game)
+
+
+async def get_game(game_id: str) -> GoGame:
+    """Look up a game, creating the default game on first use. A compacted
+    game is replayed and snapshotted on a rules thread."""
+    packed = registry.packed(game_id)
+    if packed is not None:
+        game, view = await run_rules(restore_game, *packed)
+        registry.unpack(game_id, packed[1], game, view)
+    game = registry.get(game_id)
+    if game is None:
+        if game_id != DEFAULT_GAME_ID:
+            raise HTTPException(status_code=404, detail="Game not found")
+        game, view = await run_rules(fresh_game, 19)
+        if game_id in registry:
+            # Created by another request meanwhile
+            return registry.get(game_id)
+        registry.create(game_id, game.board_size, game, view)
+        store.record_new(game_id, game.board_size)
+    return game
+
 
+async def get_view(game_id: str) -> GoGame:
+    """The published snapshot of a game, for reading only"""
+    await get_game(game_id)
+    return registry.view(game_id)
+
+
+def game_changed(game_id: str, view: GoGame):
+    """Publish, log and broadcast the move or pass just played"""
+    registry.publish(game_id, view)
+    store.record_move(game_id, view)
+    hub.move_played(game_id, view)
+
+
+def game_replaced(game_id: str, view: GoGame):
+    """Publish, log and broadcast a new game or reset"""
+    forget_game(game_id)
+    registry.publish(game_id, view)
+    store.record_new(game_id, view.board_size)
+    hub.game_replaced(game_id, view)
+
+
+@asynccontextmanager
+async def locked_game(game_id: str):
+    """Hold the game's lock so its requests are applied one at a time"""
+    await get_game(game_id)
+    async with registry.lock(game_id):
+        yield await get_game(game_id)
+
+
+async def run_rules(function, *args):
+    """Run a rule check or game change on a rules thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(rules_executor, function, *args)
+
+
+def snapshot(game: GoGame) -> GoGame:
+    """A copy of the game to publish, its states already encoded in every
+    format so readers never encode on the event loop"""
+    view = game.copy()
+    for state_format in STATE_MEDIA_TYPES:
+        if state_format != "msgpack" or msgpack_available():
+            view.serialized_state(state_format)
+    return view
+
+
+def state_response(view: GoGame, **fields) -> Response:
+    """A JSON response of `fields` plus the view's cached state as game_state"""
+    head = json.dumps(fields, separators=(",", ":"))[:-1].encode()
+    body = head + b',"game_state":' + view.serialized_state("json") + b"}"
+    return Response(body, media_type="application/json")
+
+
+def play_or_pass(game: GoGame, move) -> bool:
+    """Play the AI's move, or pass if it has none or it is illegal; True
+    for a pass"""
+    if move and game.make_move(move[0], move[1]):
+        return False
+    game.pass_turn()
+    return True
+
+
+def check_top_k(top_k: int):
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise HTTPException(
+            status_code=400, detail=f"top_k must be between 1 and {MAX_TOP_K}"
+        )
 
-def get_ai_move_sync(ai, game_state):
+
+def get_ai_move_sync(ai, game_state, deadline=None, cancel=None):
     """Synchronous wrapper for AI move calculation"""
     try:
-        return ai.get_move(game_state)
+        with ai_metrics.measure(ai):
+            # The AI plays and takes back moves in place, so it searches its
+            # own copy of the snapshot, made here rather than on the loop
+            return ai.get_move(game_state.copy(), deadline=deadline, cancel=cancel)
     except Exception as e:
         print(f"Error in AI move calculation: {e}")
         return None
@@ -61,7 +260,22 @@ class AIMoveRequest(BaseModel):
 
 
 class NewGameRequest(BaseModel):
+    board_size: int = Field(19, ge=2, le=25)
+
+
+class ReviewRequest(BaseModel):
+    """A game's moves ([row, col], or null for a pass) from an empty board,
+    or SGF text; with neither, the game under game_id is reviewed"""
+
+    moves: Optional[List[Optional[List[int]]]] = None
+    sgf: Optional[str] = None
     board_size: int = 19
+    difficulty: Optional[str] = "medium"
+    top_k: int = 3
+
+
+class InstrumentationRequest(BaseModel):
+    enabled: bool
 
 
 @app.get("/")
@@ -69,92 +283,276 @@ async def root():
     return {"message": "Go Game API"}
 
 
+@app.get("/ai/stats")
+async def ai_stats():
+    """AI metrics: transposition table hit rate and memory use, MCTS throughput"""
+    return {
+        "transposition_table": transposition_table.stats(),
+        "mcts": mcts_stats(),
+        "scheduler": scheduler.stats(),
+        "pondering": ponderer.stats(),
+        "instrumentation": ai_metrics.stats(),
+        "analysis": analysis_pool.stats(),
+    }
+
+
+@app.post("/ai/instrumentation")
+async def set_instrumentation(request: InstrumentationRequest):
+    """Turn per-phase timing of AI requests on or off"""
+    ai_metrics.enabled = request.enabled
+    return {"enabled": ai_metrics.enabled}
+
+
+@app.post("/ai/profile")
+async def arm_profile():
+    """Sample the stack of the next AI request; fetch it with GET /ai/profile"""
+    ai_metrics.arm_profile()
+    return {"status": ai_metrics.profile_status()}
+
+
+@app.get("/ai/profile")
+async def get_profile(profile_format: str = Query("json", alias="format")):
+    """The last profile capture, or its collapsed stacks for flamegraph.pl"""
+    capture = ai_metrics.last_profile
+    if profile_format == "collapsed":
+        if capture is None:
+            raise HTTPException(status_code=404, detail="No profile captured")
+        return Response(capture["collapsed"], media_type="text/plain")
+    return {"status": ai_metrics.profile_status(), "profile": capture}
+
+
+@app.get("/metrics")
+async def metrics():
+    """AI, engine, scheduler and game metrics in the Prometheus text format"""
+    families = ai_metrics.families()
+    families += stats_families("go_ai_scheduler", scheduler.stats())
+    families += stats_families("go_ai_ponder", ponderer.stats())
+    families += stats_families("go_ai_analysis", analysis_pool.stats())
+    families += stats_families("go_ai_transposition", transposition_table.stats())
+    families += stats_families("go_ai_mcts", mcts_stats())
+    families += stats_families("go_games", {**registry.stats(), **hub.stats()})
+    families += stats_families("go_store", store.stats())
+    return Response(render_metrics(families), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/games/stats")
+async def games_stats():
+    """Number of games held, how many are compacted, and evictions"""
+    return {**registry.stats(), **hub.stats(), "store": store.stats()}
+
+
 @app.get("/game/state")
-async def get_game_state():
-    """Get current game state"""
-    return game.get_board_state()
+async def get_game_state(
+    game_id: str = DEFAULT_GAME_ID,
+    state_format: str = Query("json", alias="format"),
+    ownership: bool = False,
+):
+    """Get current game state as JSON, or packed as msgpack or binary; with
+    ownership=1 the JSON and msgpack states add the ownership map"""
+    if state_format not in STATE_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Unknown format")
+    if state_format == "msgpack" and not msgpack_available():
+        raise HTTPException(status_code=400, detail="msgpack is not installed")
+    if ownership and state_format == "binary":
+        raise HTTPException(
+            status_code=400, detail="The binary format has no ownership map"
+        )
+    view = await get_view(game_id)
+    if ownership:
+        # Not encoded with the snapshot, so encode it off the event loop
+        data = await run_rules(view.serialized_state, state_format, True)
+    else:
+        data = view.serialized_state(state_format)
+    return Response(data, media_type=STATE_MEDIA_TYPES[state_format])
+
+
+@app.get("/game/analysis")
+async def analyze_game(
+    game_id: str = DEFAULT_GAME_ID,
+    difficulty: str = "medium",
+    top_k: int = DEFAULT_TOP_K,
+):
+    """The best moves for the player to move, each with its score terms"""
+    check_top_k(top_k)
+    view = await get_view(game_id)
+    return await asyncio.wrap_future(analysis_pool.analyze(view, difficulty, top_k))
+
+
+@app.post("/game/analysis")
+async def review_game(request: ReviewRequest, game_id: str = DEFAULT_GAME_ID):
+    """Annotate every move of a game with its score, rank and loss against
+    the best candidates, which are listed with their score terms"""
+    check_top_k(request.top_k)
+    if request.sgf is None and request.moves is None:
+        future = analysis_pool.load_game(await get_view(game_id))
+    else:
+        future = analysis_pool.load(request.sgf, request.moves, request.board_size)
+    try:
+        board_size, start, records = await asyncio.wrap_future(future)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    futures = analysis_pool.review(
+        start, records, request.difficulty or "medium", request.top_k
+    )
+    chunks = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+    return {
+        "board_size": board_size,
+        "moves": [annotation for chunk in chunks for annotation in chunk],
+    }
 
 
 @app.post("/game/move")
-async def make_move(move: MoveRequest):
+async def make_move(move: MoveRequest, game_id: str = DEFAULT_GAME_ID):
     """Make a move on the board"""
-    success = game.make_move(move.row, move.col)
-    if not success:
-        raise HTTPException(status_code=400, detail="Invalid move")
+    async with locked_game(game_id) as game:
+        success = await run_rules(game.make_move, move.row, move.col)
+        if not success:
+            raise HTTPException(status_code=400, detail="Invalid move")
 
-    return {"success": True, "game_state": game.get_board_state()}
+        await ponderer.stop(game_id, game)
+        view = await run_rules(snapshot, game)
+        game_changed(game_id, view)
+        return state_response(view, success=True)
 
 
 @app.post("/game/ai_move")
-async def ai_move(request: AIMoveRequest):
+async def ai_move(request: AIMoveRequest, game_id: str = DEFAULT_GAME_ID):
     """Let the AI make a move with timeout"""
-    # Check if game has ended
-    if game.game_ended:
-        print("Game has ended, AI cannot make a move")
-        return {
-            "success": True,
-            "game_state": game.get_board_state(),
-            "message": "Game has ended",
-        }
-
-    ai = GoAI(difficulty=request.difficulty or "medium", player=game.current_player)
-
-    ai_passed = False
-    try:
-        # Run AI move calculation with timeout
-        loop = asyncio.get_running_loop()
-        ai_move = await asyncio.wait_for(
-            loop.run_in_executor(executor, get_ai_move_sync, ai, game),
-            timeout=10.0,  # 10 second timeout
+    await get_game(game_id)
+    # A repeated request while the AI is thinking gets the same answer
+    # instead of a second AI move
+    task = ai_jobs.get(game_id)
+    if task is None:
+        task = asyncio.create_task(locked_ai_move(game_id, request))
+        ai_jobs[game_id] = task
+        task.add_done_callback(
+            lambda done: ai_jobs.pop(game_id) if ai_jobs.get(game_id) is done else None
         )
+    return await asyncio.shield(task)
+
+
+async def locked_ai_move(game_id: str, request: AIMoveRequest):
+    async with locked_game(game_id) as game:
+        await ponderer.stop(game_id, game)
+        view = await get_view(game_id)
+        # Check if game has ended
+        if view.game_ended:
+            print("Game has ended, AI cannot make a move")
+            return state_response(view, success=True, message="Game has ended")
+
+        ai_move = await search_ai_move(game_id, view, request)
+        ai_passed = await run_rules(play_or_pass, game, ai_move)
+        view = await run_rules(snapshot, game)
+        game_changed(game_id, view)
+        if not ai_passed:
+            ponderer.start(
+                game_id, request.difficulty or "medium", view.move_history[-1][2], view
+            )
+        return state_response(view, success=True, ai_passed=ai_passed)
+
+
+async def search_ai_move(game_id: str, view: GoGame, request: AIMoveRequest):
+    """The AI's move in the snapshot `view`, or None to pass"""
+    ai = GoAI(
+        difficulty=request.difficulty or "medium",
+        player=view.current_player,
+        parallel=parallel_search,
+        game_id=game_id,
+    )
 
-        if ai_move:
-            row, col = ai_move
-            success = game.make_move(row, col)
-            if not success:
-                # If move is invalid, just pass
-                game.pass_turn()
-                ai_passed = True
-        else:
-            game.pass_turn()  # Pass turn if no move
-            ai_passed = True
-
+    try:
+        # Run AI move calculation with timeout; time spent queued counts
+        deadline = time.monotonic() + AI_MOVE_TIMEOUT - AI_DEADLINE_MARGIN
+        return await scheduler.run(
+            get_ai_move_sync, ai, view, deadline, timeout=AI_MOVE_TIMEOUT
+        )
+    except QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="AI is busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    except SchedulerClosed:
+        raise HTTPException(status_code=503, detail="Server is shutting down")
     except asyncio.TimeoutError:
         print("AI move calculation timed out, passing turn")
-        game.pass_turn()
-        ai_passed = True
     except Exception as e:
         print(f"Error in AI move: {e}")
-        game.pass_turn()
-        ai_passed = True
-
-    return {
-        "success": True,
-        "game_state": game.get_board_state(),
-        "ai_passed": ai_passed,
-    }
+    return None
 
 
 @app.post("/game/pass")
-async def pass_turn():
+async def pass_turn(game_id: str = DEFAULT_GAME_ID):
     """Pass the current turn"""
-    game.pass_turn()
-    return {"success": True, "game_state": game.get_board_state()}
+    async with locked_game(game_id) as game:
+        await run_rules(game.pass_turn)
+        await ponderer.stop(game_id, game)
+        view = await run_rules(snapshot, game)
+        game_changed(game_id, view)
+        return state_response(view, success=True)
 
 
 @app.post("/game/new")
-async def new_game(request: NewGameRequest):
-    """Start a new game"""
-    global game
-    game = GoGame(request.board_size)
-    return {"success": True, "game_state": game.get_board_state()}
+async def new_game(request: NewGameRequest, game_id: str = DEFAULT_GAME_ID):
+    """Start a new game under game_id, replacing any game already there"""
+    if len(game_id.encode()) > MAX_GAME_ID_BYTES:
+        raise HTTPException(status_code=400, detail="game_id is too long")
+    game, view = await run_rules(fresh_game, request.board_size)
+    if game_id in registry:
+        async with registry.lock(game_id):
+            await ponderer.stop(game_id)
+            registry.create(game_id, request.board_size, game, view)
+            game_replaced(game_id, view)
+    else:
+        registry.create(game_id, request.board_size, game, view)
+        game_replaced(game_id, view)
+    return state_response(view, success=True, game_id=game_id)
 
 
 @app.post("/game/reset")
-async def reset_game():
+async def reset_game(game_id: str = DEFAULT_GAME_ID):
     """Reset the current game"""
-    game.reset_game()
-    return {"success": True, "game_state": game.get_board_state()}
+    async with locked_game(game_id) as game:
+        await ponderer.stop(game_id)
+        await run_rules(game.reset_game)
+        view = await run_rules(snapshot, game)
+        game_replaced(game_id, view)
+        return state_response(view, success=True)
+
+
+@app.websocket("/game/ws")
+async def game_updates(websocket: WebSocket, game_id: str = DEFAULT_GAME_ID):
+    """Stream a game: a snapshot on connect, then a delta per move"""
+    try:
+        view = await get_view(game_id)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    watcher = hub.subscribe(game_id, websocket)
+    channel = hub.channels[game_id]
+    watcher.send(channel.snapshot(view))
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            try:
+                message = json.loads(frame.get("text") or frame.get("bytes") or "")
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                watcher.send(
+                    json.dumps({"type": "error", "detail": "Expected a JSON object"})
+                )
+            elif message.get("type") == "resync":
+                channel.resync(watcher, await get_view(game_id), message.get("seq"))
+    except (WebSocketDisconnect, HTTPException):
+        pass
+    finally:
+        hub.unsubscribe(game_id, watcher)
 
 
 if __name__ == "__main__":
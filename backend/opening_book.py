@@ -0,0 +1,220 @@
+"""Opening book: moves played in SGF collections, looked up by position.
+
+A book is built offline from SGF files, one file per board size
+(book-19.bin and so on). Positions are keyed by a canonical Zobrist hash:
+the smallest of the position's hashes under the 8 rotations and reflections
+of the board, with the player to move mixed in. Moves are stored in that
+canonical orientation and turned back on lookup, so a joseki learned in
+one corner is found in all four.
+
+The file is a header and a table of fixed-size entries (key, point, count)
+sorted by key and, within a key, most played first. book() memory-maps the
+file of a board size on first use; a lookup is a binary search over the
+mapped table, so the book is never read into memory as a whole.
+
+Building (from backend/):
+    python opening_book.py games/*.sgf --board-size 19 --output books
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import bisect
+import mmap
+import os
+import struct
+
+from geometry import geometry
+from go_game import WHITE_TO_MOVE_KEY, GoGame, Player, zobrist_keys
+from sgf import SGFError, read_games, replay
+
+BOOK_DIR = os.environ.get(
+    "GO_BOOK_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "books")
+)
+
+# GoAI asks the book while fewer moves than this have been played
+BOOK_MOVES = 30
+
+_MAGIC = b"GOBOOK1\n"
+_HEADER = struct.Struct("<BI")  # Board size, entry count
+_ENTRY = struct.Struct("<QHH")  # Canonical key, canonical point, times played
+_OFFSET = len(_MAGIC) + _HEADER.size
+
+Point = Tuple[int, int]
+
+
+def canonical_key(game: GoGame) -> Tuple[int, int]:
+    """The canonical hash of the position and player to move, and the
+    symmetry that maps the position onto its canonical orientation"""
+    size = game.board_size
+    symmetries = geometry(size).symmetries
+    keys = zobrist_keys(size)
+    hashes = [0] * len(symmetries)
+    for color, stones, _ in game.chains():
+        table = keys[color]
+        for row, col in stones:
+            for index, mapping in enumerate(symmetries):
+                point_row, point_col = mapping[row][col]
+                hashes[index] ^= table[point_row][point_col]
+    if game.current_player == Player.WHITE:
+        hashes = [key ^ WHITE_TO_MOVE_KEY for key in hashes]
+    symmetry = min(range(len(hashes)), key=hashes.__getitem__)
+    return hashes[symmetry], symmetry
+
+
+class _Keys:
+    """The key column of a mapped book, as a sequence for bisect"""
+
+    def __init__(self, data: mmap.mmap, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        return _ENTRY.unpack_from(self.data, _OFFSET + index * _ENTRY.size)[0]
+
+
+class OpeningBook:
+    """A memory-mapped book file of one board size"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as book_file:
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"Not an opening book: {path}")
+        self.board_size, self.count = _HEADER.unpack_from(self.data, len(_MAGIC))
+        if len(self.data) != _OFFSET + self.count * _ENTRY.size:
+            raise ValueError(f"Truncated opening book: {path}")
+        self._keys = _Keys(self.data, self.count)
+
+    def moves(self, game: GoGame) -> List[Tuple[Point, int]]:
+        """Book moves of the position as (point, times played), most played
+        first; empty when the position is not in the book"""
+        key, symmetry = canonical_key(game)
+        index = bisect.bisect_left(self._keys, key)
+        back = geometry(self.board_size).symmetries[
+            geometry(self.board_size).inverse_symmetries[symmetry]
+        ]
+        moves = []
+        while index < self.count:
+            entry_key, point, count = _ENTRY.unpack_from(
+                self.data, _OFFSET + index * _ENTRY.size
+            )
+            if entry_key != key:
+                break
+            row, col = divmod(point, self.board_size)
+            moves.append((back[row][col], count))
+            index += 1
+        return moves
+
+
+@lru_cache(maxsize=None)
+def book(board_size: int) -> Optional[OpeningBook]:
+    """The book of a board size, mapped on first use; None without one"""
+    path = os.path.join(BOOK_DIR, f"book-{board_size}.bin")
+    if not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError) as e:
+        print(f"Error loading opening book {path}: {e}")
+        return None
+
+
+def book_moves(game: GoGame) -> List[Tuple[Point, int]]:
+    """Legal book moves for the player to move, most played first"""
+    if len(game.move_history) >= BOOK_MOVES:
+        return []
+    opening_book = book(game.board_size)
+    if opening_book is None:
+        return []
+    player = game.current_player
+    return [
+        (point, count)
+        for point, count in opening_book.moves(game)
+        if game.board[point[0]][point[1]] == Player.EMPTY
+        and not game.is_suicide_move(point[0], point[1], player)
+        and not game.violates_ko(point[0], point[1], player)
+    ]
+
+
+def count_moves(
+    sources: Iterable[str], board_size: int, moves: int = BOOK_MOVES
+) -> Dict[Tuple[int, int], int]:
+    """Times each (canonical key, canonical point) was played in the first
+    `moves` moves of the even games of the given SGF files"""
+    counts: Dict[Tuple[int, int], int] = {}
+    symmetries = geometry(board_size).symmetries
+    for source in sources:
+        with open(source) as sgf_file:
+            for record in read_games(sgf_file):
+                # Handicap and setup stones make openings of their own
+                if "AB" in record.properties or "AW" in record.properties:
+                    continue
+                try:
+                    played = replay(record)
+                except SGFError as e:
+                    print(f"Skipping a game in {source}: {e}")
+                    continue
+                if played.board_size != board_size:
+                    continue
+                game = GoGame(board_size)
+                for move in played.move_history[:moves]:
+                    if move is None or move[2] != game.current_player:
+                        break
+                    row, col, player = move
+                    key, symmetry = canonical_key(game)
+                    book_row, book_col = symmetries[symmetry][row][col]
+                    entry = (key, book_row * board_size + book_col)
+                    counts[entry] = counts.get(entry, 0) + 1
+                    game.play(row, col, player)
+    return counts
+
+
+def write_book(
+    path: str,
+    board_size: int,
+    counts: Dict[Tuple[int, int], int],
+    min_count: int = 2,
+    max_moves: int = 8,
+) -> int:
+    """Write the moves played at least `min_count` times, at most
+    `max_moves` per position; returns the number of entries"""
+    by_key: Dict[int, List[Tuple[int, int]]] = {}
+    for (key, point), count in counts.items():
+        if count >= min_count:
+            by_key.setdefault(key, []).append((min(count, 0xFFFF), point))
+    entries = []
+    for key in sorted(by_key):
+        for count, point in sorted(by_key[key], reverse=True)[:max_moves]:
+            entries.append(_ENTRY.pack(key, point, count))
+
+    with open(path + ".tmp", "wb") as book_file:
+        book_file.write(_MAGIC)
+        book_file.write(_HEADER.pack(board_size, len(entries)))
+        book_file.write(b"".join(entries))
+    os.replace(path + ".tmp", path)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book from SGF")
+    parser.add_argument("sgf", nargs="+", help="SGF files or collections")
+    parser.add_argument("--board-size", type=int, default=19)
+    parser.add_argument("--moves", type=int, default=BOOK_MOVES)
+    parser.add_argument("--min-count", type=int, default=2)
+    parser.add_argument("--max-moves", type=int, default=8, help="per position")
+    parser.add_argument("--output", default=BOOK_DIR, help="book directory")
+    args = parser.parse_args()
+
+    counts = count_moves(args.sgf, args.board_size, args.moves)
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"book-{args.board_size}.bin")
+    entries = write_book(path, args.board_size, counts, args.min_count, args.max_moves)
+    print(f"{entries} book moves from {len(counts)} distinct ones written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Root-parallel AI search across a pool of worker processes.
+
+The position is shipped to each worker as GoGame.to_compact() bytes. For
+alpha-beta each iterative-deepening depth splits the most promising root
+moves round-robin between the workers; for MCTS every worker grows its own
+tree from the root with a different seed and the visit counts are summed.
+
+Cancelling the GoAI's search reaches the workers through a shared array of
+flags: each search takes a slot, and while it waits for its workers it
+raises the slot's flag as soon as the GoAI's cancel event is set.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import multiprocessing
+import os
+import threading
+import time
+
+from go_game import GoGame, Player
+
+if TYPE_CHECKING:
+    from ai_opponent import GoAI
+
+Move = Tuple[int, int]
+
+# Searches that can be cancelled at once, and how often a waiting search
+# looks at its cancel event; searches past the slots run to their deadline
+CANCEL_SLOTS = 64
+CANCEL_POLL = 0.02
+
+# The pool's cancel flags, set in each worker by _init_worker
+_cancel_flags = None
+
+
+def _init_worker(flags):
+    global _cancel_flags
+    _cancel_flags = flags
+
+
+class _CancelFlag:
+    """Stands in for the cancel event of a GoAI or MCTSEngine in a worker"""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+
+    def is_set(self) -> bool:
+        return bool(_cancel_flags[self.slot])
+
+
+def _cancel_flag(slot: Optional[int]) -> Optional[_CancelFlag]:
+    return _CancelFlag(slot) if slot is not None else None
+
+
+def _search_chunk(
+    compact: bytes,
+    difficulty: str,
+    player_value: int,
+    chunk: List[Tuple[Move, float]],
+    static_scores: Dict[Move, float],
+    depth: int,
+    deadline: Optional[float],
+    slot: Optional[int] = None,
+) -> Tuple[Optional[List[Tuple[Move, float]]], int]:
+    """Search some root moves `depth` plies deep in a worker; None on timeout
+    or cancellation"""
+    from ai_opponent import GoAI, SearchTimeout
+
+    game = GoGame.from_compact(compact)
+    ai = GoAI(difficulty, Player(player_value))
+    ai.cancel = _cancel_flag(slot)
+    try:
+        scores = ai._search_root(game, chunk, static_scores, depth, deadline)
+    except SearchTimeout:
+        scores = None
+    return scores, ai.nodes_searched
+
+
+def _mcts_chunk(
+    compact: bytes,
+    difficulty: str,
+    player_value: int,
+    valid_moves: List[Move],
+    deadline: Optional[float],
+    seed: int,
+    slot: Optional[int] = None,
+) -> Tuple[Dict[Move, int], Dict[str, float]]:
+    """Grow one independent MCTS tree in a worker; root visit counts"""
+    from ai_opponent import GoAI, MCTSEngine
+
+    game = GoGame.from_compact(compact)
+    config = GoAI(difficulty, Player(player_value)).config
+    engine = MCTSEngine(
+        Player(player_value),
+        max_playouts=config["max_playouts"],
+        time_limit=config["time_limit"],
+        seed=seed,
+        cancel=_cancel_flag(slot),
+    )
+    visits = engine.root_visits(game, valid_moves, deadline, reuse_tree=False)
+    return visits, engine.stats
+
+
+class ParallelSearch:
+    """Process pool that splits a GoAI root search across CPU cores"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Spawned rather than forked: the server forks from a threaded process
+        context = multiprocessing.get_context("spawn")
+        self.flags = context.Array("b", CANCEL_SLOTS, lock=False)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.flags,),
+        )
+        self._free_slots = list(range(CANCEL_SLOTS))
+        self._slots_lock = threading.Lock()
+
+    def _take_slot(self) -> Optional[int]:
+        with self._slots_lock:
+            return self._free_slots.pop() if self._free_slots else None
+
+    def _release_slot(self, slot: Optional[int]):
+        if slot is None:
+            return
+        self.flags[slot] = 0
+        with self._slots_lock:
+            self._free_slots.append(slot)
+
+    def _results(self, futures: List, cancel, slot: Optional[int]) -> List:
+        """Wait for the futures, raising the slot's flag once `cancel` is set"""
+        pending = set(futures)
+        while pending:
+            if cancel is None or slot is None:
+                wait(pending)
+                break
+            _, pending = wait(pending, timeout=CANCEL_POLL)
+            if cancel.is_set():
+                self.flags[slot] = 1
+        return [future.result() for future in futures]
+
+    def warm_up(self):
+        """Start every worker and import the engine so the first move is not slow"""
+        compact = GoGame(9).to_compact()
+        futures = [
+            self.executor.submit(_search_chunk, compact, "easy", 2, [], {}, 2, None)
+            for _ in range(self.workers)
+        ]
+        for future in futures:
+            future.result()
+
+    def search(
+        self,
+        ai: "GoAI",
+        game: GoGame,
+        valid_moves: List[Move],
+        deadline: Optional[float] = None,
+    ) -> Tuple[List[Tuple[Move, float]], int]:
+        """Drop-in for GoAI._search: (move_scores, completed_depth)"""
+        ai.nodes_searched = 0
+        move_scores = ai._score_moves(game, valid_moves, deadline=deadline)
+        ai.completed_depth = 1
+        if ai.config["search_depth"] < 2 or not move_scores:
+            return move_scores, 1
+
+        static_scores = dict(move_scores)
+        width = ai.config["search_width"]
+        compact = game.to_compact()
+        slot = self._take_slot()
+        try:
+            for depth in range(2, ai.config["search_depth"] + 1):
+                if ai._stopped(deadline):
+                    break
+                # Same root ordering as GoAI._search_root, split round-robin
+                ordered = ai._order_moves(game, move_scores, ai.player)
+                root_moves = ordered[:width]
+                # CLOCK_MONOTONIC is system wide, so the deadline holds in workers
+                futures = [
+                    self.executor.submit(
+                        _search_chunk,
+                        compact,
+                        ai.difficulty,
+                        ai.player.value,
+                        root_moves[i :: self.workers],
+                        static_scores,
+                        depth,
+                        deadline,
+                        slot,
+                    )
+                    for i in range(min(self.workers, len(root_moves)))
+                ]
+
+                searched = []
+                timed_out = False
+                for scores, nodes in self._results(futures, ai.cancel, slot):
+                    ai.nodes_searched += nodes
+                    if scores is None:
+                        timed_out = True
+                    else:
+                        searched.extend(scores)
+                if timed_out:
+                    break
+                searched.sort(key=lambda x: x[1], reverse=True)
+                move_scores = searched + ordered[width:]
+                ai.completed_depth = depth
+        finally:
+            self._release_slot(slot)
+
+        return move_scores, ai.completed_depth
+
+    def mcts_move(
+        self,
+        ai: "GoAI",
+        game: GoGame,
+        valid_moves: List[Move],
+        deadline: Optional[float] = None,
+    ) -> Optional[Move]:
+        """Root-parallel MCTS: independent trees, summed root visits"""
+        start = time.monotonic()
+        compact = game.to_compact()
+        slot = self._take_slot()
+        try:
+            futures = [
+                self.executor.submit(
+                    _mcts_chunk,
+                    compact,
+                    ai.difficulty,
+                    ai.player.value,
+                    valid_moves,
+                    deadline,
+                    seed,
+                    slot,
+                )
+                for seed in range(self.workers)
+            ]
+            results = self._results(futures, ai.cancel, slot)
+        finally:
+            self._release_slot(slot)
+
+        visits: Dict[Move, int] = {}
+        playouts = 0
+        for worker_visits, stats in results:
+            playouts += stats.get("playouts", 0)
+            for move, count in worker_visits.items():
+                visits[move] = visits.get(move, 0) + count
+
+        elapsed = max(time.monotonic() - start, 1e-9)
+        ai.search_stats = {
+            "playouts": playouts,
+            "seconds": elapsed,
+            "playouts_per_sec": playouts / elapsed,
+            "workers": self.workers,
+        }
+        if not visits:
+            return valid_moves[0] if valid_moves else None
+        return max(visits, key=visits.get)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
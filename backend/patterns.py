@@ -0,0 +1,188 @@
+"""3x3 shape patterns and a bounded ladder reader.
+
+GoGame keeps a 16-bit pattern code for every point: the 8 points around
+it, 2 bits each (empty, black, white or off the board, in the slot order of
+geometry.PATTERN_OFFSETS). A stone placed or removed only rewrites the codes
+of the 8 points around it, so looking up the shape at a candidate is one
+index into SHAPE_TABLE.
+
+The table marks the good-shape points of the classic playout patterns
+(hane, cuts and the edge moves used by MoGo-style policies). Each pattern
+below is written with X and O for the two colors, x for "not X" (O, empty
+or off the board), o for "not O", ? for anything and a space for off the
+board; it is expanded into every rotation, reflection and color swap, so
+the table does not depend on who is to move.
+
+ladder_captured() reads whether a chain in atari can run away when the
+attacker keeps giving atari, by playing the sequence on the game itself and
+taking it back. It gives up after LADDER_DEPTH attacker moves or
+LADDER_NODES positions and then assumes the chain escapes. Results are
+cached by position hash, since a search reaches the same ataris from many
+sibling moves and plies.
+"""
+
+from typing import Dict, List, Tuple
+
+from geometry import OFF_BOARD, PATTERN_OFFSETS
+from go_game import GoGame, Player
+
+# Score for playing a point whose surroundings match a good-shape pattern
+SHAPE_BONUS = 3.0
+
+# Bounds of one ladder read: attacker moves, and positions looked at
+LADDER_DEPTH = 40
+LADDER_NODES = 200
+
+# Ladder results kept by (board size, position hash, chain point), cleared
+# when full
+LADDER_CACHE_SIZE = 1 << 16
+_ladders: Dict[Tuple[int, int, int, int], bool] = {}
+
+# Center row and column are the candidate point, always empty
+_SHAPES = [
+    # Hane: enclosing, non-cutting and magari
+    ["XOX", "...", "???"],
+    ["XO.", "...", "?.?"],
+    ["XO?", "X..", "x.?"],
+    # Diagonal attachment
+    [".O.", "X..", "..."],
+    # Cuts: unprotected, peeped and the de (pushing through) cut
+    ["XO?", "O.o", "?o?"],
+    ["XO?", "O.X", "???"],
+    ["?X?", "O.O", "ooo"],
+    ["OX?", "o.O", "???"],
+    # On the edge: chase, blocking a cut or a connection, sagari and cut
+    ["X.?", "O.?", "   "],
+    ["OX?", "X.O", "   "],
+    ["?X?", "x.O", "   "],
+    ["?XO", "x.x", "   "],
+    ["?OX", "X.O", "   "],
+]
+
+_VALUES = {".": Player.EMPTY.value, "X": 1, "O": 2, " ": OFF_BOARD}
+_WILDCARDS = {"?": ".XO ", "x": ".O ", "o": ".X "}
+
+
+def _variants(shape: List[str]) -> List[List[str]]:
+    """The 8 rotations and reflections of a shape and their color swaps"""
+    variants = []
+    for rotated in (shape, ["".join(line) for line in zip(*shape[::-1])]):
+        for flipped in (rotated, rotated[::-1]):
+            for mirrored in (flipped, [line[::-1] for line in flipped]):
+                variants.append(mirrored)
+                swapped = "".join(mirrored).translate(str.maketrans("XOxo", "OXox"))
+                variants.append([swapped[0:3], swapped[3:6], swapped[6:9]])
+    return variants
+
+
+def _codes(cells: str) -> List[int]:
+    """Pattern codes matching a 3x3 shape, its wildcards expanded"""
+    codes = [0]
+    for slot, (dr, dc) in enumerate(PATTERN_OFFSETS):
+        symbol = cells[(dr + 1) * 3 + dc + 1]
+        choices = _WILDCARDS.get(symbol, symbol)
+        codes = [
+            code | _VALUES[choice] << 2 * slot for code in codes for choice in choices
+        ]
+    return codes
+
+
+def _build_table() -> bytearray:
+    table = bytearray(1 << 2 * len(PATTERN_OFFSETS))
+    for shape in _SHAPES:
+        for variant in _variants(shape):
+            for code in _codes("".join(variant)):
+                table[code] = 1
+    return table
+
+
+# 1 at the codes of good-shape points, indexed by GoGame.pattern_code()
+SHAPE_TABLE = _build_table()
+
+
+def ladder_captured(game: GoGame, row: int, col: int) -> bool:
+    """Whether the chain at (row, col), in atari, is lost to a ladder.
+
+    Its owner moves first. The game is left as it was.
+    """
+    key = (game.board_size, game.position_hash, row, col)
+    captured = _ladders.get(key)
+    if captured is None:
+        captured = _read_ladder(game, row, col, LADDER_DEPTH, [LADDER_NODES])
+        _remember(key, captured)
+    return captured
+
+
+def ladder_after(
+    game: GoGame, row: int, col: int, player: Player, target: Tuple[int, int]
+) -> bool:
+    """Whether `player`'s atari at (row, col) catches the chain at `target`.
+
+    The move is only played when the result is not cached yet.
+    """
+    key = (
+        game.board_size,
+        game.hash_after_move(row, col, player),
+        target[0],
+        target[1],
+    )
+    captured = _ladders.get(key)
+    if captured is None:
+        if not game.play(row, col, player):
+            return False
+        try:
+            captured = _read_ladder(
+                game, target[0], target[1], LADDER_DEPTH, [LADDER_NODES]
+            )
+        finally:
+            game.undo()
+        _remember(key, captured)
+    return captured
+
+
+def _remember(key: Tuple[int, int, int, int], captured: bool):
+    if len(_ladders) >= LADDER_CACHE_SIZE:
+        _ladders.clear()
+    _ladders[key] = captured
+
+
+def _read_ladder(
+    game: GoGame, row: int, col: int, depth: int, budget: List[int]
+) -> bool:
+    liberties = game.liberties_at(row, col)
+    if len(liberties) != 1:
+        return not liberties
+    if depth <= 0 or budget[0] <= 0:
+        return False  # Too long to read, assume the chain gets out
+    budget[0] -= 1
+
+    color = game.board[row][col]
+    attacker = Player.WHITE if color == Player.BLACK else Player.BLACK
+
+    # Capturing a surrounding chain in atari breaks the ladder
+    board = game.board
+    for stone_row, stone_col in game.get_group(row, col):
+        for neighbor_row, neighbor_col in game.get_neighbors(stone_row, stone_col):
+            if (
+                board[neighbor_row][neighbor_col] == attacker
+                and len(game.liberties_at(neighbor_row, neighbor_col)) == 1
+            ):
+                return False
+
+    escape_row, escape_col = next(iter(liberties))
+    if not game.play(escape_row, escape_col, color):
+        return True
+    try:
+        liberties = list(game.liberties_at(row, col))
+        if len(liberties) != 2:
+            return len(liberties) < 2
+        for attack_row, attack_col in liberties:
+            if game.play(attack_row, attack_col, attacker):
+                try:
+                    if _read_ladder(game, row, col, depth - 1, budget):
+                        return True
+                finally:
+                    game.undo()
+        return False
+    finally:
+        game.undo()
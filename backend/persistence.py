@@ -0,0 +1,280 @@
+"""Durable storage of games: an append-only move log plus periodic snapshots.
+
+GameStore is the interface and does nothing, so the server runs without a
+data directory. LogStore keeps games on disk:
+
+- Every new game, reset, move and pass is appended to the current log file
+  as a few bytes (moves use the 2-byte encoding of encoding.pack_moves).
+  Appends only touch an in-memory buffer; a background thread writes and
+  fsyncs the buffer every `flush_interval` seconds, so a crash loses at most
+  that window of moves and requests never wait for the disk.
+- After `snapshot_every` log records the thread writes a snapshot of every
+  game's packed history, starts a new log file and deletes the old ones, so
+  recovery reads one snapshot and a bounded log tail.
+
+Recovery does not replay any moves: games come back as packed histories,
+which GameRegistry.restore() holds compacted until a game is next used.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import struct
+import threading
+
+from encoding import pack_moves
+from go_game import GoGame
+
+_NEW, _MOVE, _DELETE = 1, 2, 3
+_RECORD = struct.Struct("<BH")  # Record type, game ID length
+# Longest game ID, in UTF-8 bytes, that log records and snapshots can hold
+MAX_GAME_ID_BYTES = 0xFFFF
+_SNAPSHOT_MAGIC = b"GOSNAP1\n"
+_SNAPSHOT_GAME = struct.Struct("<HBI")  # ID length, board size, history bytes
+
+
+class GameStore:
+    """No persistence; the base class for storage backends"""
+
+    def record_new(self, game_id: str, board_size: int):
+        """A new game, or a reset, under `game_id`"""
+
+    def record_move(self, game_id: str, game: GoGame):
+        """The last move or pass of `game`"""
+
+    def record_delete(self, game_id: str):
+        """The game is gone, e.g. evicted for being idle"""
+
+    def load(self) -> Iterator[Tuple[str, int, bytes]]:
+        """Stored games as (game_id, board_size, packed move history)"""
+        return iter(())
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+    def close(self):
+        pass
+
+
+class LogStore(GameStore):
+    """Append-only move log with batched fsync and periodic snapshots"""
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval: float = 0.05,
+        snapshot_every: int = 100_000,
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+
+        # Every game's board size and packed history, the source of snapshots
+        self._games: Dict[str, Tuple[int, bytearray]] = {}
+        self.generation = self._recover()
+        self._log = open(self._log_path(self.generation), "ab")
+
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._records_since_snapshot = 0
+        self.records = 0
+        self.flushes = 0
+        self.snapshots = 0
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._run, name="game-store", daemon=True
+        )
+        self._flusher.start()
+
+    # Appends, called on the event loop
+
+    def record_new(self, game_id: str, board_size: int):
+        with self._lock:
+            self._games[game_id] = (board_size, bytearray())
+            self._append(_NEW, game_id, bytes((board_size,)))
+
+    def record_move(self, game_id: str, game: GoGame):
+        entry = game.move_history[-1]
+        if entry is not None:
+            entry = (entry[0], entry[1], entry[2].value)
+        packed = pack_moves([entry], game.board_size)
+        with self._lock:
+            if game_id not in self._games:
+                return  # Created before the store, nothing to append to
+            self._games[game_id][1].extend(packed)
+            self._append(_MOVE, game_id, packed)
+
+    def record_delete(self, game_id: str):
+        with self._lock:
+            if self._games.pop(game_id, None) is not None:
+                self._append(_DELETE, game_id, b"")
+
+    def _append(self, kind: int, game_id: str, payload: bytes):
+        key = game_id.encode()
+        self._pending.append(_RECORD.pack(kind, len(key)) + key + payload)
+        self._records_since_snapshot += 1
+        self.records += 1
+
+    # Background flushing and snapshots
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+            if self._records_since_snapshot >= self.snapshot_every:
+                self.snapshot()
+        self.flush()
+
+    def flush(self):
+        """Write and fsync the buffered records"""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if pending:
+                self._log.write(b"".join(pending))
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self.flushes += 1
+
+    def snapshot(self):
+        """Write every game to a new snapshot and drop the logs it covers"""
+        with self._io_lock:
+            self._snapshot()
+
+    def _snapshot(self):
+        with self._lock:
+            # Records from here on go to the next log, after the snapshot
+            pending, self._pending = self._pending, []
+            games = [
+                (game_id, size, bytes(history))
+                for game_id, (size, history) in self._games.items()
+            ]
+            self._records_since_snapshot = 0
+        self._log.write(b"".join(pending))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._log.close()
+
+        generation = self.generation + 1
+        self._log = open(self._log_path(generation), "ab")
+        path = os.path.join(self.directory, "snapshot")
+        with open(path + ".tmp", "wb") as snapshot_file:
+            snapshot_file.write(_SNAPSHOT_MAGIC + struct.pack("<I", generation))
+            for game_id, size, history in games:
+                key = game_id.encode()
+                snapshot_file.write(_SNAPSHOT_GAME.pack(len(key), size, len(history)))
+                snapshot_file.write(key + history)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(path + ".tmp", path)
+        self._fsync_directory()
+
+        for old in self._log_numbers():
+            if old < generation:
+                os.remove(self._log_path(old))
+        self.generation = generation
+        self.snapshots += 1
+
+    # Recovery
+
+    def load(self) -> Iterator[Tuple[str, int, bytes]]:
+        with self._lock:
+            games = list(self._games.items())
+        for game_id, (size, history) in games:
+            yield game_id, size, bytes(history)
+
+    def _recover(self) -> int:
+        """Read the snapshot and the logs after it; returns the log to append to"""
+        generation = 0
+        path = os.path.join(self.directory, "snapshot")
+        if os.path.exists(path):
+            with open(path, "rb") as snapshot_file:
+                data = snapshot_file.read()
+            if not data.startswith(_SNAPSHOT_MAGIC):
+                raise ValueError(f"Not a game snapshot: {path}")
+            offset = len(_SNAPSHOT_MAGIC)
+            (generation,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            while offset < len(data):
+                key_length, size, history_length = _SNAPSHOT_GAME.unpack_from(
+                    data, offset
+                )
+                offset += _SNAPSHOT_GAME.size
+                game_id = data[offset : offset + key_length].decode()
+                offset += key_length
+                history = bytearray(data[offset : offset + history_length])
+                offset += history_length
+                self._games[game_id] = (size, history)
+
+        for number in self._log_numbers():
+            if number >= generation:
+                self._replay_log(self._log_path(number))
+                generation = number
+        return generation
+
+    def _replay_log(self, path: str):
+        with open(path, "rb") as log_file:
+            data = log_file.read()
+        offset = 0
+        valid = 0
+        while offset + _RECORD.size <= len(data):
+            kind, key_length = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            payload = start + key_length
+            end = payload + {_NEW: 1, _MOVE: 2, _DELETE: 0}.get(kind, -1)
+            if end < payload or end > len(data):
+                break  # Torn final write
+            game_id = data[start:payload].decode()
+            if kind == _NEW:
+                self._games[game_id] = (data[payload], bytearray())
+            elif kind == _MOVE and game_id in self._games:
+                self._games[game_id][1].extend(data[payload:end])
+            elif kind == _DELETE:
+                self._games.pop(game_id, None)
+            offset = valid = end
+        if valid < len(data):
+            # Drop the torn tail so new records follow a whole one
+            with open(path, "r+b") as log_file:
+                log_file.truncate(valid)
+
+    def _log_numbers(self) -> List[int]:
+        return sorted(
+            int(name[len("log.") :])
+            for name in os.listdir(self.directory)
+            if name.startswith("log.") and name[len("log.") :].isdigit()
+        )
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"log.{generation}")
+
+    def _fsync_directory(self):
+        try:
+            descriptor = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return  # Not supported on this platform
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "games": len(self._games),
+                "records": self.records,
+                "pending_records": len(self._pending),
+                "flushes": self.flushes,
+                "snapshots": self.snapshots,
+                "log_generation": self.generation,
+            }
+
+    def close(self):
+        """Flush what is buffered and stop the background thread"""
+        self._closed.set()
+        self._flusher.join()
+        self._log.close()
+
+
+def open_store(directory: Optional[str]) -> GameStore:
+    """LogStore in `directory`, or the no-op GameStore without one"""
+    return LogStore(directory) if directory else GameStore()
@@ -0,0 +1,310 @@
+"""Lightweight board for fast random playouts.
+
+PlayoutBoard trades the bookkeeping of GoGame (history, undo, superko,
+Player enums) for speed: points are indexes into a padded 1D list with a
+border sentinel, chains are circular linked lists with a head pointer and
+a pseudo-liberty count, and only simple ko is enforced.
+"""
+
+from typing import List, Optional, Tuple
+import random
+
+from go_game import GoGame, Player
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+PASS = -1
+
+
+class PlayoutBoard:
+    """Padded 1D Go board with pseudo-liberty chain tracking"""
+
+    __slots__ = (
+        "size",
+        "stride",
+        "color",
+        "head",
+        "next_stone",
+        "chain_size",
+        "pseudo_liberties",
+        "empties",
+        "empty_index",
+        "ko",
+        "offsets",
+        "diagonals",
+    )
+
+    def __init__(self, size: int):
+        self.size = size
+        self.stride = stride = size + 2
+        points = stride * stride
+        self.color = [BORDER] * points
+        self.head = list(range(points))
+        self.next_stone = list(range(points))
+        self.chain_size = [0] * points
+        self.pseudo_liberties = [0] * points
+        self.empties: List[int] = []
+        self.empty_index = [-1] * points
+        self.ko = PASS
+        self.offsets = (1, -1, stride, -stride)
+        self.diagonals = (stride + 1, stride - 1, -stride + 1, -stride - 1)
+        for row in range(size):
+            for col in range(size):
+                point = (row + 1) * stride + col + 1
+                self.color[point] = EMPTY
+                self.empty_index[point] = len(self.empties)
+                self.empties.append(point)
+
+    @classmethod
+    def from_game(cls, game: GoGame) -> "PlayoutBoard":
+        """Build a playout board holding the stones of a GoGame"""
+        board = cls(game.board_size)
+        for row in range(game.board_size):
+            for col in range(game.board_size):
+                cell = game.board[row][col]
+                if cell != Player.EMPTY:
+                    board.play(board.point(row, col), cell.value)
+        if game.ko_position is not None:
+            board.ko = board.point(*game.ko_position)
+        return board
+
+    def copy(self) -> "PlayoutBoard":
+        other = PlayoutBoard.__new__(PlayoutBoard)
+        other.size = self.size
+        other.stride = self.stride
+        other.color = self.color[:]
+        other.head = self.head[:]
+        other.next_stone = self.next_stone[:]
+        other.chain_size = self.chain_size[:]
+        other.pseudo_liberties = self.pseudo_liberties[:]
+        other.empties = self.empties[:]
+        other.empty_index = self.empty_index[:]
+        other.ko = self.ko
+        other.offsets = self.offsets
+        other.diagonals = self.diagonals
+        return other
+
+    def point(self, row: int, col: int) -> int:
+        return (row + 1) * self.stride + col + 1
+
+    def coordinates(self, point: int) -> Tuple[int, int]:
+        row, col = divmod(point, self.stride)
+        return row - 1, col - 1
+
+    def is_legal(self, point: int, color: int) -> bool:
+        """Empty, not the ko point and not suicide"""
+        board = self.color
+        if board[point] != EMPTY or point == self.ko:
+            return False
+        stride = self.stride
+        neighbors = (point + 1, point - 1, point + stride, point - stride)
+        for neighbor in neighbors:
+            if board[neighbor] == EMPTY:
+                return True
+
+        # Every neighbour is occupied. Subtracting the pseudo-liberties that
+        # point at `point` tells whether a chain keeps another liberty.
+        head = self.head
+        heads = [head[neighbor] for neighbor in neighbors]
+        for neighbor, chain in zip(neighbors, heads):
+            neighbor_color = board[neighbor]
+            if neighbor_color == BORDER:
+                continue
+            remaining = self.pseudo_liberties[chain] - heads.count(chain)
+            if neighbor_color == color:
+                if remaining > 0:
+                    return True
+            elif remaining == 0:
+                return True  # Captures
+        return False
+
+    def is_eye(self, point: int, color: int) -> bool:
+        """True for a single-point eye of `color` that playouts should not fill"""
+        board = self.color
+        for offset in self.offsets:
+            neighbor = board[point + offset]
+            if neighbor != color and neighbor != BORDER:
+                return False
+        enemy = 3 - color
+        false_corners = 0
+        at_edge = False
+        for offset in self.diagonals:
+            diagonal = board[point + offset]
+            if diagonal == enemy:
+                false_corners += 1
+            elif diagonal == BORDER:
+                at_edge = True
+        return false_corners == 0 if at_edge else false_corners <= 1
+
+    def play(self, point: int, color: int) -> int:
+        """Place a stone (assumed legal) and return the number captured"""
+        board = self.color
+        head = self.head
+        next_stone = self.next_stone
+        pseudo_liberties = self.pseudo_liberties
+        offsets = self.offsets
+
+        board[point] = color
+        self._remove_empty(point)
+        head[point] = point
+        next_stone[point] = point
+        self.chain_size[point] = 1
+        liberties = 0
+        for offset in offsets:
+            neighbor = point + offset
+            neighbor_color = board[neighbor]
+            if neighbor_color == EMPTY:
+                liberties += 1
+            elif neighbor_color != BORDER:
+                pseudo_liberties[head[neighbor]] -= 1
+        pseudo_liberties[point] = liberties
+
+        for offset in offsets:
+            neighbor = point + offset
+            if board[neighbor] == color and head[neighbor] != head[point]:
+                self._merge(head[point], head[neighbor])
+
+        captured = 0
+        captured_point = PASS
+        enemy = 3 - color
+        for offset in offsets:
+            neighbor = point + offset
+            if board[neighbor] == enemy and pseudo_liberties[head[neighbor]] == 0:
+                captured += self._remove_chain(head[neighbor])
+                captured_point = neighbor
+
+        chain = head[point]
+        if (
+            captured == 1
+            and self.chain_size[chain] == 1
+            and pseudo_liberties[chain] == 1
+        ):
+            self.ko = captured_point
+        else:
+            self.ko = PASS
+        return captured
+
+    def _remove_empty(self, point: int):
+        empties = self.empties
+        index = self.empty_index[point]
+        last = empties.pop()
+        if last != point:
+            empties[index] = last
+            self.empty_index[last] = index
+        self.empty_index[point] = -1
+
+    def _add_empty(self, point: int):
+        self.empty_index[point] = len(self.empties)
+        self.empties.append(point)
+
+    def _merge(self, first: int, second: int):
+        """Merge chain `second` into `first` (both heads), smaller relabelled"""
+        chain_size = self.chain_size
+        if chain_size[first] < chain_size[second]:
+            first, second = second, first
+        head = self.head
+        next_stone = self.next_stone
+        stone = second
+        while True:
+            head[stone] = first
+            stone = next_stone[stone]
+            if stone == second:
+                break
+        next_stone[first], next_stone[second] = next_stone[second], next_stone[first]
+        chain_size[first] += chain_size[second]
+        self.pseudo_liberties[first] += self.pseudo_liberties[second]
+
+    def _remove_chain(self, chain: int) -> int:
+        board = self.color
+        head = self.head
+        next_stone = self.next_stone
+        pseudo_liberties = self.pseudo_liberties
+        stones = []
+        stone = chain
+        while True:
+            stones.append(stone)
+            board[stone] = EMPTY
+            self._add_empty(stone)
+            stone = next_stone[stone]
+            if stone == chain:
+                break
+        for stone in stones:
+            for offset in self.offsets:
+                neighbor = stone + offset
+                if board[neighbor] == BLACK or board[neighbor] == WHITE:
+                    pseudo_liberties[head[neighbor]] += 1
+        return len(stones)
+
+    def random_move(self, color: int, rng: random.Random) -> int:
+        """A random legal move that does not fill an own eye, or PASS"""
+        empties = self.empties
+        count = len(empties)
+        if not count:
+            return PASS
+        start = rng.randrange(count)
+        for index in range(start, start + count):
+            point = empties[index % count]
+            if not self.is_eye(point, color) and self.is_legal(point, color):
+                return point
+        return PASS
+
+    def playout(
+        self, color: int, rng: random.Random, max_moves: Optional[int] = None
+    ) -> List[int]:
+        """Play random moves until two passes; returns the points played"""
+        if max_moves is None:
+            max_moves = 3 * self.size * self.size
+        # random_move inlined with local lookups: this is the hot loop
+        empties = self.empties
+        is_eye = self.is_eye
+        is_legal = self.is_legal
+        play = self.play
+        random_fraction = rng.random
+        played = []
+        passes = 0
+        while passes < 2 and len(played) < max_moves:
+            count = len(empties)
+            point = PASS
+            start = int(random_fraction() * count)
+            for index in range(start - count, start):
+                candidate = empties[index]
+                if not is_eye(candidate, color) and is_legal(candidate, color):
+                    point = candidate
+                    break
+            if point == PASS:
+                passes += 1
+            else:
+                passes = 0
+                play(point, color)
+                played.append(point)
+            color = 3 - color
+        return played
+
+    def area_score(self, komi: float = 0.0) -> float:
+        """Black area minus white area minus komi.
+
+        Empty points count for a color when all their neighbours are that
+        color, which is exact at the end of a playout where only eyes
+        remain empty.
+        """
+        board = self.color
+        black = white = 0
+        for point in range(len(board)):
+            color = board[point]
+            if color == BLACK:
+                black += 1
+            elif color == WHITE:
+                white += 1
+            elif color == EMPTY:
+                seen = 0
+                for offset in self.offsets:
+                    seen |= 1 << board[point + offset]
+                seen &= ~(1 << BORDER)
+                if seen == 1 << BLACK:
+                    black += 1
+                elif seen == 1 << WHITE:
+                    white += 1
+        return black - white - komi
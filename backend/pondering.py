@@ -0,0 +1,111 @@
+"""Background pondering: the AI keeps searching during the human's turn.
+
+After an AI move, Ponderer.start() hands GoAI.ponder() the game's published
+snapshot as a background job of the AIScheduler, which only runs it on an idle worker
+and stops it when a request needs the worker. The search results land
+where get_move already looks: the transposition table for the alpha-beta
+levels, the cached tree for MCTS. A budget in seconds bounds the work per
+human turn.
+
+Every request that changes a game stops its pondering first with stop().
+Results for the position the human actually reached are kept; those for
+the other replies are dropped from the table. Resets and new games drop
+them all.
+"""
+
+from concurrent.futures import Future
+from typing import Dict, Optional
+import asyncio
+import threading
+import time
+
+from ai_opponent import GoAI
+from go_game import GoGame, Player
+from scheduler import AIScheduler
+
+
+class _PonderJob:
+    __slots__ = ("ai", "future", "cancel")
+
+    def __init__(self, ai: GoAI, future: Future, cancel: threading.Event):
+        self.ai = ai
+        self.future = future  # Resolves to the table keys searched
+        self.cancel = cancel
+
+
+class Ponderer:
+    """At most one pondering job per game, run on the scheduler's idle workers"""
+
+    def __init__(self, scheduler: AIScheduler, budget: float = 0.0):
+        self.scheduler = scheduler
+        self.budget = budget  # Seconds per human turn; 0 turns pondering off
+        self._jobs: Dict[str, _PonderJob] = {}
+        self.started = 0
+        self.skipped = 0  # Not started because every worker was busy
+        self.hits = 0  # Human replies that had been searched
+        self.misses = 0
+        self.positions = 0
+        self.seconds = 0.0
+
+    def start(self, game_id: str, difficulty: str, player: Player, game: GoGame):
+        """Ponder for the AI playing `player` in `game`, a snapshot in which
+        the human is to move; it is copied before the search, not changed"""
+        if self.budget <= 0 or game.game_ended or game_id in self._jobs:
+            return
+        ai = GoAI(difficulty, player=player, game_id=game_id)
+        job = self.scheduler.run_background(self._ponder, ai, game)
+        if job is None:
+            self.skipped += 1
+            return
+        future, cancel = job
+        self._jobs[game_id] = _PonderJob(ai, future, cancel)
+        self.started += 1
+
+    def _ponder(self, ai: GoAI, game: GoGame, cancel: threading.Event):
+        start = time.monotonic()
+        try:
+            return ai.ponder(game.copy(), start + self.budget, cancel)
+        except Exception as e:
+            print(f"Error while pondering: {e}")
+            return []
+        finally:
+            self.seconds += time.monotonic() - start
+
+    async def stop(self, game_id: str, game: Optional[GoGame] = None):
+        """Stop pondering `game_id` and wait for it to finish.
+
+        Results for `game`'s position are kept, the rest dropped.
+        """
+        job = self._jobs.pop(game_id, None)
+        if job is None:
+            return
+        job.cancel.set()
+        keys = await asyncio.wrap_future(job.future)
+        self.positions += len(keys)
+        keep = job.ai._table_key(game) if game is not None else None
+        if keys and game is not None:
+            if keep in keys:
+                self.hits += 1
+            else:
+                self.misses += 1
+        for key in keys:
+            if key != keep:
+                job.ai.table.discard(key)
+
+    def forget(self, game_id: str):
+        """Stop pondering a game that is gone, without waiting"""
+        job = self._jobs.pop(game_id, None)
+        if job is not None:
+            job.cancel.set()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "budget_seconds": self.budget,
+            "active": len(self._jobs),
+            "started": self.started,
+            "skipped": self.skipped,
+            "positions": self.positions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "seconds": self.seconds,
+        }
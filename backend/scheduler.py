@@ -0,0 +1,203 @@
+"""Thread pool for AI searches with backpressure and cancellation.
+
+Jobs run in submission order. Each job gets a threading.Event that is set
+when its caller stops waiting (timeout, disconnect or shutdown); GoAI
+checks it while searching, so an abandoned search frees its worker within
+a few milliseconds instead of running to completion. A job still waiting
+in the queue when it is cancelled is skipped.
+
+Background jobs (pondering) only start on an idle worker, and a job
+submitted while every worker is taken cancels them, so they never add to
+the CPU the workers use or delay a request by more than a few milliseconds.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import threading
+import time
+
+
+class QueueFull(Exception):
+    """Raised when too many AI jobs are already waiting"""
+
+
+class SchedulerClosed(Exception):
+    """Raised for jobs submitted after shutdown"""
+
+
+class _Timing:
+    """Count, mean and maximum of a duration"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class AIScheduler:
+    """Bounded FIFO of AI jobs run on a small thread pool"""
+
+    def __init__(self, workers: int = 1, max_queue: int = 16):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ai-search"
+        )
+        self.closed = False
+        self._lock = threading.Lock()
+        self._cancels: Set[threading.Event] = set()
+        self._background: Set[threading.Event] = set()
+        self.pending = 0  # Submitted and not finished: queued or running
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.background = 0  # Background jobs running
+        self.background_started = 0
+        self.background_preempted = 0
+        self.queue_wait = _Timing()
+        self.compute = _Timing()
+
+    async def run(
+        self,
+        function: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run function(*args, cancel=event) on a worker and return its result.
+
+        Raises QueueFull when max_queue jobs are already waiting, and
+        asyncio.TimeoutError after `timeout` seconds. In both the timeout and
+        the cancelled case the job's event is set so the search stops.
+        """
+        if self.closed:
+            raise SchedulerClosed()
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFull()
+            self.pending += 1
+            self.submitted += 1
+            # Make room by stopping background work
+            if self.pending > self.workers and self._background:
+                self.background_preempted += len(self._background)
+                for background in self._background:
+                    background.set()
+        cancel = threading.Event()
+        self._cancels.add(cancel)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, self._run_job, cancel, time.monotonic(), function, args
+        )
+        try:
+            # Shielded so a timeout cancels the search, not just the wait
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            cancel.set()
+            with self._lock:
+                self.cancelled += 1
+            raise
+        finally:
+            self._cancels.discard(cancel)
+
+    def _run_job(
+        self,
+        cancel: threading.Event,
+        submitted: float,
+        function: Callable[..., Any],
+        args: tuple,
+    ) -> Any:
+        started = time.monotonic()
+        with self._lock:
+            self.queue_wait.add(started - submitted)
+            if cancel.is_set():
+                self.pending -= 1
+                self.skipped += 1
+                return None
+            self.running += 1
+        try:
+            return function(*args, cancel=cancel)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.running -= 1
+                self.completed += 1
+                self.compute.add(time.monotonic() - started)
+
+    def run_background(
+        self, function: Callable[..., Any], *args: Any
+    ) -> Optional[Tuple[Future, threading.Event]]:
+        """Start function(*args, cancel=event) on an idle worker.
+
+        Returns the job's future and cancel event, or None when every worker
+        is busy. The event is set as soon as a run() job needs the worker.
+        """
+        if self.closed:
+            return None
+        with self._lock:
+            if self.pending >= self.workers:
+                return None
+            self.pending += 1
+            self.background += 1
+            self.background_started += 1
+            cancel = threading.Event()
+            self._background.add(cancel)
+        return self.executor.submit(
+            self._run_background, cancel, function, args
+        ), cancel
+
+    def _run_background(
+        self, cancel: threading.Event, function: Callable[..., Any], args: tuple
+    ) -> Any:
+        try:
+            return function(*args, cancel=cancel)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.background -= 1
+                self._background.discard(cancel)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, job counts and timings, for the metrics endpoint"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.pending - self.running - self.background,
+                "running": self.running,
+                "background": self.background,
+                "background_started": self.background_started,
+                "background_preempted": self.background_preempted,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "skipped": self.skipped,
+                "rejected": self.rejected,
+                "queue_wait": self.queue_wait.stats(),
+                "compute": self.compute.stats(),
+            }
+
+    def shutdown(self):
+        """Stop accepting jobs and cancel the ones in flight"""
+        self.closed = True
+        for cancel in list(self._cancels) + list(self._background):
+            cancel.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
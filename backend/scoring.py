@@ -0,0 +1,213 @@
+"""Area scoring, dead-stone estimation and an ownership map.
+
+area_score() is Tromp-Taylor: a color scores its stones plus the empty
+regions that reach only that color, found with one flood fill over the
+empty points. Players rarely capture hopeless stones before passing, so
+estimate() first guesses which stones are dead:
+
+- Each color's stones are grouped with the empty points they can reach
+  without crossing an enemy stone. A group with room to live (more than
+  LIVING_SPACE empty points) or two eyes is alive.
+- Otherwise it is dead when every enemy chain around it has more
+  liberties than its weakest chain, i.e. it would lose the capturing race.
+
+Dead stones count for the opponent and their points join the surrounding
+empty region. An empty point is settled (+1 black, -1 white) when its
+region reaches only one color and the net influence there does not favour
+the other color; otherwise it gets a damped influence value. In regions
+covering half the board or more, the owner's stones must reach the point,
+so a wide open area next to one wall is not counted as territory yet.
+"""
+
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from geometry import geometry
+from go_game import GoGame, Player
+
+Point = Tuple[int, int]
+
+# Komi for white, in points; also used by the MCTS playouts
+DEFAULT_KOMI = 7.5
+
+# Empty points a group can reach beyond which it is treated as alive: four
+# in a row or bent can always make two eyes
+LIVING_SPACE = 3
+
+# Influence that maps to an ownership of 1 for unsettled points, which are
+# capped below 1 so that only settled points reach it
+INFLUENCE_SCALE = 4.0
+UNSETTLED_LIMIT = 0.9
+
+
+class Score(NamedTuple):
+    """Area of each color; the margin is from black's side after komi"""
+
+    black: int
+    white: int
+    komi: float
+
+    @property
+    def margin(self) -> float:
+        return self.black - self.white - self.komi
+
+    @property
+    def winner(self) -> Optional[Player]:
+        if self.margin > 0:
+            return Player.BLACK
+        if self.margin < 0:
+            return Player.WHITE
+        return None
+
+    def to_dict(self) -> dict:
+        winner = self.winner
+        return {
+            "black": self.black,
+            "white": self.white,
+            "komi": self.komi,
+            "margin": self.margin,
+            "winner": winner.name.lower() if winner is not None else None,
+        }
+
+
+class Estimate(NamedTuple):
+    """Ownership of every point (+1 black to -1 white), dead stones, score"""
+
+    ownership: List[List[float]]
+    dead: Set[Point]
+    score: Score
+
+
+def _regions(game: GoGame, removed: Set[Point]):
+    """Yield each empty region and the colors it touches; `removed` is empty"""
+    size = game.board_size
+    board = game.board
+    neighbors = geometry(size).neighbors
+    seen = set()
+    for row in range(size):
+        for col in range(size):
+            if (row, col) in seen or (
+                board[row][col] != Player.EMPTY and (row, col) not in removed
+            ):
+                continue
+            region = [(row, col)]
+            seen.add((row, col))
+            borders = set()
+            for point_row, point_col in region:
+                for point in neighbors[point_row][point_col]:
+                    color = board[point[0]][point[1]]
+                    if color == Player.EMPTY or point in removed:
+                        if point not in seen:
+                            seen.add(point)
+                            region.append(point)
+                    else:
+                        borders.add(color)
+            yield region, borders
+
+
+def area_score(
+    game: GoGame, komi: float = DEFAULT_KOMI, dead: Set[Point] = frozenset()
+) -> Score:
+    """Tromp-Taylor area score, with the `dead` stones taken off first"""
+    area = {Player.BLACK: 0, Player.WHITE: 0}
+    for row in range(game.board_size):
+        for col in range(game.board_size):
+            color = game.board[row][col]
+            if color != Player.EMPTY and (row, col) not in dead:
+                area[color] += 1
+    for region, borders in _regions(game, dead):
+        if len(borders) == 1:
+            area[borders.pop()] += len(region)
+    return Score(area[Player.BLACK], area[Player.WHITE], komi)
+
+
+def dead_stones(game: GoGame) -> Set[Point]:
+    """Stones that look dead: no room, fewer than two eyes, losing the race"""
+    size = game.board_size
+    board = game.board
+    neighbors = geometry(size).neighbors
+    liberties_at = {}
+    for _, stones, liberties in game.chains():
+        for stone in stones:
+            liberties_at[stone] = len(liberties)
+
+    dead = set()
+    for color, enemy in ((Player.BLACK, Player.WHITE), (Player.WHITE, Player.BLACK)):
+        seen = set()
+        for row in range(size):
+            for col in range(size):
+                if board[row][col] != color or (row, col) in seen:
+                    continue
+                # Stones and empty points reachable without crossing an enemy
+                group = [(row, col)]
+                seen.add((row, col))
+                empties = eyes = 0
+                enemies = set()
+                for point_row, point_col in group:
+                    around = neighbors[point_row][point_col]
+                    if board[point_row][point_col] == Player.EMPTY:
+                        empties += 1
+                        if all(board[r][c] == color for r, c in around):
+                            eyes += 1
+                    for point in around:
+                        if board[point[0]][point[1]] == enemy:
+                            enemies.add(point)
+                        elif point not in seen:
+                            seen.add(point)
+                            group.append(point)
+                if empties > LIVING_SPACE or eyes >= 2 or not enemies:
+                    continue
+                stones = [
+                    point for point in group if board[point[0]][point[1]] == color
+                ]
+                weakest = min(liberties_at[point] for point in stones)
+                if all(liberties_at[point] > weakest for point in enemies):
+                    dead.update(stones)
+    return dead
+
+
+def estimate(game: GoGame, komi: float = DEFAULT_KOMI) -> Estimate:
+    """Dead stones, the ownership map and the score it implies"""
+    size = game.board_size
+    board = game.board
+    influence_table = geometry(size).influence
+    dead = dead_stones(game)
+
+    influence = [[0.0] * size for _ in range(size)]
+    ownership = [[0.0] * size for _ in range(size)]
+    area = {Player.BLACK: 0, Player.WHITE: 0}
+    for row in range(size):
+        for col in range(size):
+            color = board[row][col]
+            if color == Player.EMPTY:
+                continue
+            sign = 1.0 if color == Player.BLACK else -1.0
+            if (row, col) in dead:
+                ownership[row][col] = -sign
+                area[Player.WHITE if color == Player.BLACK else Player.BLACK] += 1
+                continue
+            ownership[row][col] = sign
+            area[color] += 1
+            for point_row, point_col, weight in influence_table[row][col]:
+                influence[point_row][point_col] += sign * weight
+
+    for region, borders in _regions(game, dead):
+        owner = borders.pop() if len(borders) == 1 else None
+        owner_sign = 1.0 if owner == Player.BLACK else -1.0
+        # In half the board or more only points the owner's stones reach count
+        wide_open = len(region) * 2 >= size * size
+        for row, col in region:
+            value = influence[row][col]
+            favoured = value * owner_sign
+            if owner is not None and (favoured > 0 or favoured == 0 and not wide_open):
+                if (row, col) not in dead:
+                    ownership[row][col] = owner_sign
+                    area[owner] += 1
+            elif (row, col) not in dead:
+                scaled = max(
+                    -UNSETTLED_LIMIT, min(UNSETTLED_LIMIT, value / INFLUENCE_SCALE)
+                )
+                ownership[row][col] = round(scaled, 2)
+
+    return Estimate(
+        ownership, dead, Score(area[Player.BLACK], area[Player.WHITE], komi)
+    )
@@ -0,0 +1,226 @@
+"""Registry of concurrent games keyed by game ID.
+
+Recently used games are kept as live GoGame objects. Games left alone for
+`compact_after` seconds are stored as their packed move history (2 bytes
+per move) and replayed on the next request, games idle for `idle_timeout`
+seconds are dropped, and the least recently used games are dropped once
+there are more than `max_games`. packed() and unpack() let the caller do
+the replay elsewhere, e.g. off the event loop.
+
+Next to the live game each session holds its view: an immutable snapshot
+published after every change. Readers and the AI only see views, so they
+never observe a game halfway through a move, and changes, which take the
+game's lock, never wait for them.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import asyncio
+import time
+
+from go_game import GoGame
+
+
+class _Session:
+    __slots__ = ("board_size", "game", "view", "history", "lock", "last_used")
+
+    def __init__(
+        self, board_size: int, game: Optional[GoGame] = None, history: bytes = b""
+    ):
+        self.board_size = board_size
+        self.game = game
+        self.view: Optional[GoGame] = None
+        self.history = history
+        self.lock: Optional[asyncio.Lock] = None
+        self.last_used = time.monotonic()
+
+    def busy(self) -> bool:
+        return self.lock is not None and self.lock.locked()
+
+
+class GameRegistry:
+    """Games by ID with per-game locks, idle compaction and eviction"""
+
+    def __init__(
+        self,
+        max_games: int = 50_000,
+        idle_timeout: float = 24 * 3600,
+        compact_after: float = 60.0,
+        backend: str = "list",
+        on_evict: Optional[Callable[[str], None]] = None,
+        on_compact: Optional[Callable[[str], None]] = None,
+    ):
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.compact_after = compact_after
+        self.backend = backend
+        # Called with the ID of every evicted game, e.g. to delete it on disk
+        self.on_evict = on_evict
+        # Called with the ID of every compacted game, e.g. to drop its caches
+        self.on_compact = on_compact
+        # Both in least recently used order; `_live` only holds uncompacted games
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._live: "OrderedDict[str, _Session]" = OrderedDict()
+        self.evictions = 0
+        self.compactions = 0
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(
+        self,
+        game_id: str,
+        board_size: int = 19,
+        game: Optional[GoGame] = None,
+        view: Optional[GoGame] = None,
+    ) -> GoGame:
+        """Start a new game under `game_id`, replacing any existing one.
+
+        `game` and its snapshot `view` can be built beforehand, off the
+        event loop.
+        """
+        self.sweep()
+        if game is None:
+            game = GoGame(board_size, backend=self.backend)
+        session = self._sessions.get(game_id)
+        if session is None:
+            session = _Session(board_size, game)
+            self._sessions[game_id] = session
+        else:
+            session.board_size = board_size
+            session.game = game
+            session.history = b""
+        session.view = view
+        self._touch(game_id, session)
+        self._evict(time.monotonic())
+        return game
+
+    def restore(self, game_id: str, board_size: int, history: bytes):
+        """Add a game from its packed history; it is replayed when next used"""
+        session = _Session(board_size, history=history)
+        self._sessions[game_id] = session
+        self._touch(game_id, session)
+
+    def packed(self, game_id: str) -> Optional[Tuple[int, bytes]]:
+        """Board size and packed history of a compacted game, else None"""
+        session = self._sessions.get(game_id)
+        if session is None or session.game is not None:
+            return None
+        return session.board_size, session.history
+
+    def unpack(self, game_id: str, history: bytes, game: GoGame, view: GoGame):
+        """Make `game`, replayed from the `history` packed(game_id) gave, and
+        its snapshot `view` live again, unless the game changed meanwhile"""
+        session = self._sessions.get(game_id)
+        if session is None or session.game is not None or session.history != history:
+            return
+        session.game = game
+        session.view = view
+        session.history = b""
+        self._touch(game_id, session)
+
+    def get(self, game_id: str) -> Optional[GoGame]:
+        """The game for `game_id`, restored if it was compacted, or None"""
+        self.sweep()
+        session = self._sessions.get(game_id)
+        if session is None:
+            return None
+        if session.game is None:
+            session.game = GoGame.from_history_bytes(
+                session.board_size, session.history, backend=self.backend
+            )
+            session.history = b""
+        self._touch(game_id, session)
+        return session.game
+
+    def view(self, game_id: str) -> Optional[GoGame]:
+        """The last published snapshot of the game, which must not be changed.
+
+        A game restored or created without one gets a copy of the game.
+        """
+        game = self.get(game_id)
+        if game is None:
+            return None
+        session = self._sessions[game_id]
+        if session.view is None:
+            session.view = game.copy()
+        return session.view
+
+    def publish(self, game_id: str, view: GoGame):
+        """Make `view`, a snapshot taken after a change, what readers see"""
+        session = self._sessions.get(game_id)
+        if session is not None:
+            session.view = view
+
+    def lock(self, game_id: str) -> asyncio.Lock:
+        """Lock serializing requests for one game (created on first use)"""
+        session = self._sessions[game_id]
+        if session.lock is None:
+            session.lock = asyncio.Lock()
+        return session.lock
+
+    def remove(self, game_id: str):
+        self._sessions.pop(game_id, None)
+        self._live.pop(game_id, None)
+
+    def sweep(self, now: Optional[float] = None):
+        """Compact and evict idle games; cheap when there is nothing to do"""
+        if now is None:
+            now = time.monotonic()
+
+        self._compact(now)
+        self._evict(now)
+
+    def _compact(self, now: float):
+        # Busy games are moved to the back, so each loop visits a game once
+        for _ in range(len(self._live)):
+            game_id, session = next(iter(self._live.items()))
+            if now - session.last_used < self.compact_after:
+                break
+            if session.busy():
+                self._touch(game_id, session)
+                continue
+            session.history = session.game.history_bytes()
+            session.game = None
+            session.view = None
+            del self._live[game_id]
+            self.compactions += 1
+            if self.on_compact is not None:
+                self.on_compact(game_id)
+
+    def _evict(self, now: float):
+        for _ in range(len(self._sessions)):
+            game_id, session = next(iter(self._sessions.items()))
+            expired = now - session.last_used >= self.idle_timeout
+            if not expired and len(self._sessions) <= self.max_games:
+                break
+            if session.busy():
+                self._touch(game_id, session)
+                continue
+            self.remove(game_id)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(game_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "games": len(self._sessions),
+            "live_games": len(self._live),
+            "max_games": self.max_games,
+            "compacted_bytes": sum(
+                len(session.history) for session in self._sessions.values()
+            ),
+            "compactions": self.compactions,
+            "evictions": self.evictions,
+        }
+
+    def _touch(self, game_id: str, session: _Session):
+        session.last_used = time.monotonic()
+        self._sessions[game_id] = session
+        self._sessions.move_to_end(game_id)
+        if session.game is not None:
+            self._live[game_id] = session
+            self._live.move_to_end(game_id)
@@ -0,0 +1,223 @@
+"""SGF (Smart Game Format) export and streaming import.
+
+read_games() tokenizes its input chunk by chunk and yields one SGFRecord per
+game tree as soon as the tree is closed, so a collection of any size is read
+in memory proportional to its largest game. Only the main line of each game
+is kept; other variations are skipped. replay() then plays a record through
+GoGame, which checks every move against the rules.
+"""
+
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import re
+
+from go_game import GoGame, Player
+
+CHUNK_SIZE = 1 << 16
+
+# One token: a tree or node delimiter, a property name or a property value.
+# Values may contain escaped "]" and span lines.
+_TOKEN = re.compile(r"\s*(?:([();])|([A-Za-z]+)|\[((?:[^\]\\]|\\.)*)\])", re.S)
+_ESCAPE = re.compile(r"\\(\r\n|\n\r|\n|\r|.)", re.S)
+
+_COLORS = {"B": Player.BLACK, "W": Player.WHITE}
+
+
+class SGFError(ValueError):
+    """Malformed SGF, or a game whose moves break the rules"""
+
+
+class SGFRecord(NamedTuple):
+    """The main line of one game tree"""
+
+    properties: Dict[str, List[str]]  # Root node
+    moves: List[Tuple[str, str]]  # ("B" or "W", point), "" for a pass
+
+
+def _unescape(value: str) -> str:
+    # Escaped line breaks are removed; other escapes stand for the character
+    return _ESCAPE.sub(lambda m: "" if m.group(1)[0] in "\r\n" else m.group(1), value)
+
+
+def _chunks(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    if isinstance(source, str):
+        yield source
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source
+
+
+def read_games(source: Union[str, Iterable[str]]) -> Iterator[SGFRecord]:
+    """Yield the games of an SGF collection one at a time.
+
+    `source` is SGF text, a text file object or any iterable of text chunks.
+    """
+    buffer = ""
+    depth = 0
+    # For each open tree: whether it is on the main line, and whether one of
+    # its child variations has been seen (only the first is followed)
+    main_line: List[bool] = []
+    child_seen: List[bool] = []
+    properties: Dict[str, List[str]] = {}
+    moves: List[Tuple[str, str]] = []
+    nodes = 0
+    name: Optional[str] = None
+
+    for chunk in _chunks(source):
+        buffer += chunk
+        position = 0
+        while True:
+            match = _TOKEN.match(buffer, position)
+            if match is None:
+                rest = buffer[position:].lstrip()
+                if rest and rest[0] != "[":
+                    raise SGFError(f"Unexpected character: {rest[0]!r}")
+                break  # Incomplete value, wait for the next chunk
+            if match.end() == len(buffer) and match.group(2):
+                break  # A name that may continue in the next chunk
+            position = match.end()
+            delimiter, identifier, value = match.groups()
+
+            if delimiter == "(":
+                on_main = not main_line or (main_line[-1] and not child_seen[-1])
+                if child_seen:
+                    child_seen[-1] = True
+                main_line.append(on_main)
+                child_seen.append(False)
+                depth += 1
+            elif delimiter == ")":
+                if not depth:
+                    raise SGFError("Unbalanced ')'")
+                main_line.pop()
+                child_seen.pop()
+                depth -= 1
+                if not depth:
+                    yield SGFRecord(properties, moves)
+                    properties, moves, nodes, name = {}, [], 0, None
+            elif delimiter == ";":
+                if not depth:
+                    raise SGFError("Node outside a game tree")
+                nodes += main_line[-1]
+                name = None
+            elif not depth:
+                raise SGFError("Property outside a game tree")
+            elif identifier is not None:
+                # Old files spell names with lower case letters, e.g. "AddBlack"
+                name = "".join(letter for letter in identifier if letter.isupper())
+            else:
+                if name is None:
+                    raise SGFError("Property value without a name")
+                if not main_line[-1]:
+                    continue
+                if name in _COLORS:
+                    moves.append((name, value.strip()))
+                elif nodes == 1:
+                    properties.setdefault(name, []).append(_unescape(value))
+                elif name in ("AB", "AW", "AE"):
+                    raise SGFError("Setup stones are only supported in the root")
+
+        buffer = buffer[position:]
+
+    if depth or buffer.strip():
+        raise SGFError("Unexpected end of SGF input")
+
+
+def _point(value: str, board_size: int) -> Optional[Tuple[int, int]]:
+    """SGF point to (row, col); None for a pass ("" or "tt" on small boards)"""
+    if value == "" or (value == "tt" and board_size <= 19):
+        return None
+    if len(value) != 2:
+        raise SGFError(f"Bad point: {value!r}")
+    col, row = ord(value[0]) - ord("a"), ord(value[1]) - ord("a")
+    if not (0 <= row < board_size and 0 <= col < board_size):
+        raise SGFError(f"Point off the board: {value!r}")
+    return row, col
+
+
+def _points(values: List[str], board_size: int) -> Iterator[Tuple[int, int]]:
+    """Expand point lists, including "aa:cc" rectangles"""
+    for value in values:
+        if ":" in value:
+            first, second = (_point(part, board_size) for part in value.split(":"))
+            for row in range(min(first[0], second[0]), max(first[0], second[0]) + 1):
+                for col in range(
+                    min(first[1], second[1]), max(first[1], second[1]) + 1
+                ):
+                    yield row, col
+        else:
+            point = _point(value, board_size)
+            if point is not None:
+                yield point
+
+
+def replay(record: SGFRecord, backend: str = "list") -> GoGame:
+    """Play a record through GoGame; SGFError on the first illegal move"""
+    properties = record.properties
+    try:
+        board_size = int(properties.get("SZ", ["19"])[0].split(":")[0])
+    except ValueError:
+        raise SGFError(f"Bad board size: {properties['SZ'][0]!r}")
+    if not 2 <= board_size <= 25:
+        raise SGFError(f"Unsupported board size: {board_size}")
+
+    game = GoGame(board_size, backend=backend)
+    if "AB" in properties or "AW" in properties:
+        board = [list(row) for row in game.board]
+        for key, player in (("AB", Player.BLACK), ("AW", Player.WHITE)):
+            for row, col in _points(properties.get(key, []), board_size):
+                board[row][col] = player
+        game.board = board
+        game.current_player = Player.WHITE if "AB" in properties else Player.BLACK
+    if properties.get("PL"):
+        game.current_player = _COLORS.get(properties["PL"][0].upper()[:1], Player.BLACK)
+
+    for number, (color, value) in enumerate(record.moves, 1):
+        point = _point(value, board_size)
+        if point is None:
+            game.current_player = _COLORS[color]
+            game._pass()
+        elif not game.play(point[0], point[1], _COLORS[color]):
+            raise SGFError(f"Illegal move {number}: {color}[{value}]")
+    return game
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("]", "\\]")
+
+
+def _sgf_point(row: int, col: int) -> str:
+    return chr(ord("a") + col) + chr(ord("a") + row)
+
+
+def to_sgf(game: GoGame, properties: Optional[Dict[str, str]] = None) -> str:
+    """One-game SGF collection with the game's setup stones, moves and passes"""
+    # Taking back every move leaves the starting position, setup included
+    start = game.copy()
+    while start.undo():
+        pass
+    root = {"GM": "1", "FF": "4", "CA": "UTF-8", "SZ": str(game.board_size)}
+    root.update(properties or {})
+    parts = ["(;"]
+    parts.extend(f"{key}[{_escape(value)}]" for key, value in root.items())
+    setup = False
+    for key, player in (("AB", Player.BLACK), ("AW", Player.WHITE)):
+        points = [
+            _sgf_point(row, col)
+            for row in range(start.board_size)
+            for col in range(start.board_size)
+            if start.board[row][col] == player
+        ]
+        if points:
+            setup = True
+            parts.append(key + "".join(f"[{point}]" for point in points))
+    if setup or start.current_player != Player.BLACK:
+        parts.append(f"PL[{'B' if start.current_player == Player.BLACK else 'W'}]")
+    for record in game._undo_stack:
+        point = "" if record.move is None else _sgf_point(*record.move)
+        parts.append(f";{'B' if record.player == Player.BLACK else 'W'}[{point}]")
+    parts.append(")")
+    return "".join(parts)
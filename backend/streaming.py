@@ -0,0 +1,137 @@
+"""WebSocket fan-out of game updates.
+
+Each game with watchers has a GameChannel. Every change is numbered and
+encoded to JSON once, then the same text is queued for every watcher, so
+the cost of a move does not grow with the number of spectators. Moves and
+passes are sent as deltas (see GoGame.last_delta); new games and resets as
+full snapshots. A client that notices a gap in the sequence numbers sends
+{"type": "resync", "seq": <last seen>} and gets the missed deltas, or a
+snapshot if they are no longer buffered. A frame that is not a JSON object
+is answered with {"type": "error", "detail": ...}.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+import asyncio
+import json
+
+from fastapi import WebSocket
+
+from go_game import GoGame
+
+# Deltas kept per game for resync, and messages a slow client may fall behind
+RESYNC_BUFFER = 64
+CLIENT_BACKLOG = 64
+
+
+class _Watcher:
+    """One WebSocket with its own send queue, so a slow client never blocks"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(CLIENT_BACKLOG)
+        self.writer = asyncio.create_task(self._write())
+
+    def send(self, text: str) -> bool:
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self):
+        self.writer.cancel()
+
+    async def _write(self):
+        while True:
+            text = await self.queue.get()
+            await self.websocket.send_text(text)
+
+
+class GameChannel:
+    """Sequence numbers, recent deltas and watchers of one game"""
+
+    def __init__(self):
+        self.seq = 0
+        self.recent: Deque[Tuple[int, str]] = deque(maxlen=RESYNC_BUFFER)
+        self.watchers: Set[_Watcher] = set()
+
+    def snapshot(self, game: GoGame) -> str:
+        """A snapshot message around the game's cached JSON state"""
+        state = game.serialized_state("json").decode()
+        return f'{{"type":"snapshot","seq":{self.seq},"game_state":{state}}}'
+
+    def publish(self, message: Dict):
+        """Number, encode once and queue a message for every watcher"""
+        self.seq += 1
+        message["seq"] = self.seq
+        text = json.dumps(message)
+        self.recent.append((self.seq, text))
+        self._broadcast(text)
+
+    def publish_snapshot(self, game: GoGame):
+        """Number and queue a snapshot; older deltas can no longer be resent"""
+        self.seq += 1
+        self.recent.clear()
+        self._broadcast(self.snapshot(game))
+
+    def _broadcast(self, text: str):
+        for watcher in list(self.watchers):
+            if not watcher.send(text):
+                # Too far behind: drop it, the client reconnects for a snapshot
+                self.watchers.discard(watcher)
+                watcher.close()
+                asyncio.create_task(watcher.websocket.close(code=1013))
+
+    def resync(self, watcher: _Watcher, game: GoGame, seen: Optional[int]):
+        """Send the deltas after `seen`, or a snapshot if they are gone or
+        `seen` is not a sequence number"""
+        oldest = self.recent[0][0] if self.recent else self.seq + 1
+        if not isinstance(seen, int) or not oldest - 1 <= seen <= self.seq:
+            watcher.send(self.snapshot(game))
+            return
+        for seq, text in self.recent:
+            if seq > seen:
+                watcher.send(text)
+
+
+class StreamHub:
+    """Channels by game ID; a channel exists while it has watchers"""
+
+    def __init__(self):
+        self.channels: Dict[str, GameChannel] = {}
+
+    def move_played(self, game_id: str, game: GoGame):
+        """Broadcast the last move or pass as a delta"""
+        channel = self.channels.get(game_id)
+        if channel is not None:
+            channel.publish({"type": "delta", **game.last_delta()})
+
+    def game_replaced(self, game_id: str, game: GoGame):
+        """Broadcast a full snapshot after a new game or reset"""
+        channel = self.channels.get(game_id)
+        if channel is not None:
+            channel.publish_snapshot(game)
+
+    def subscribe(self, game_id: str, websocket: WebSocket) -> _Watcher:
+        channel = self.channels.setdefault(game_id, GameChannel())
+        watcher = _Watcher(websocket)
+        channel.watchers.add(watcher)
+        return watcher
+
+    def unsubscribe(self, game_id: str, watcher: _Watcher):
+        watcher.close()
+        channel = self.channels.get(game_id)
+        if channel is None:
+            return
+        channel.watchers.discard(watcher)
+        if not channel.watchers:
+            del self.channels[game_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self.channels),
+            "watchers": sum(
+                len(channel.watchers) for channel in self.channels.values()
+            ),
+        }
@@ -0,0 +1,113 @@
+"""Bounded transposition table shared by GoAI searches.
+
+Entries are keyed by a position key (GoGame.zobrist_key plus whatever else
+changes the evaluation, such as the difficulty) and survive across API
+requests, so a position the AI has already searched is not evaluated again.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+import sys
+import threading
+
+# Bound flags for search scores
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TTEntry(NamedTuple):
+    """A cached search result for one position"""
+
+    depth: int
+    score: float
+    flag: int
+    best_move: Optional[Tuple[int, int]]
+    # Root entries also keep every scored candidate, best first
+    move_scores: Optional[List[Tuple[Tuple[int, int], float]]] = None
+
+
+def _entry_size(key: Hashable, entry: TTEntry) -> int:
+    """Approximate bytes held by one entry (key, entry and its move list)"""
+    size = sys.getsizeof(key) + sys.getsizeof(entry)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(part) for part in key)
+    if entry.move_scores is not None:
+        size += sys.getsizeof(entry.move_scores)
+        # Each item is a (move, score) tuple holding a (row, col) tuple
+        size += len(entry.move_scores) * (
+            sys.getsizeof(((0, 0), 0.0)) + sys.getsizeof((0, 0)) + sys.getsizeof(0.0)
+        )
+    return size
+
+
+class TranspositionTable:
+    """LRU-bounded cache of TTEntry values with depth-preferred replacement"""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, TTEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[TTEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(self, key: Hashable, entry: TTEntry) -> None:
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                # Keep a deeper result rather than overwrite it
+                if existing.depth > entry.depth:
+                    return
+                self._bytes -= _entry_size(key, existing)
+            self._entries[key] = entry
+            self._bytes += _entry_size(key, entry)
+            self.stores += 1
+
+            while len(self._entries) > self.max_entries:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._bytes -= _entry_size(old_key, old_entry)
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Drop the entry of `key`, if there is one"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= _entry_size(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit rate and memory use, for the metrics endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "memory_bytes": self._bytes,
+            }